@@ -1,38 +1,83 @@
 import os
 import sys
-import csv
 import subprocess
-import datetime
-import pandas as pd
+from array import array
+from functools import partial
+from itertools import compress
 import tkinter as tk
-from tkinter import messagebox, filedialog, simpledialog, PhotoImage
-import pyperclip
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+from tkinter import ttk, messagebox, filedialog, simpledialog
 import json
-from PIL import Image, ImageTk
+from assets import AssetCache, icon_size
+from diagnostics import metrics, timed, instrument, setup_log, log_snapshot, DIAGNOSTICS_LOG
+from search_engine import normalize_term
+from termbase import TermBase
+from duplicates import DUPLICATE
+from federation import Federation, SheetSource, cache_key
+from term_qa import check_translation
+from sheet_cache import SheetCache, CACHE_FILE, fetch_revision
+from sheet_worker import SheetWorker
+from sheet_client import open_worksheet, RemoteWorksheet
+from exporter import export_rows, export_format, default_filename, EXPORT_FORMATS
+from write_journal import WriteJournal, JOURNAL_FILE, ReplayReport
 
 CONFIG_FILE = 'config.json'
-
+SUGGEST_DELAY_MS = 120
+RETRY_INTERVAL_MS = 30000
+POLL_INTERVAL = 30
+FULL_CHECK_POLLS = 10
+REVIEW_PAGE_SIZE = 200
+REVIEW_VISIBLE_ROWS = 20
+REVIEW_CHECKED = '\u2611'
+REVIEW_UNCHECKED = '\u2610'
+DIAGNOSTICS_REFRESH_MS = 1000
+LOG_SNAPSHOT_MS = 5 * 60 * 1000
+# Ctrl+M cycles through these; the first looks up source terms, the others search words of a column
+SEARCH_MODES = ('Source', 'Target', 'Notes')
+SEARCH_COLUMNS = {'Target': 'Target Term', 'Notes': 'Notes'}
 
 
 class SimpleTermOnline:
     def __init__(self, root):
         self.root = root
+        self.assets = AssetCache(root)
         self.setup_icon()
         self.sheet_id = None
         self.json_keyfile_path = None
         self.sheet = None
-        self.df = None
+        self.sheet_cache = SheetCache(CACHE_FILE)
+        self.termbase = TermBase()
+        self.worksheet_name = None
+        self.server_url = None
+        self.server_token = None
+        self.source_lang = None
+        self.target_lang = None
+        self.sheet_sources = []
+        self.suggest_job = None
+        self.render_job = None
+        self.rendered = {}
+        self.rendered_notes = ""
+        self.window_pinned = False
+        self.write_generation = 0
+        self.sheet_stale = False
+        self.poll_interval = POLL_INTERVAL
+        self.poll_count = 0
+        self.journal = WriteJournal(JOURNAL_FILE)
+        self.flush_queued = False
         self.results = []
         self.current_index = 0
         self.current_search_term = ""
+        self.search_mode = SEARCH_MODES[0]
         self.username = None
 
+        # Only what the window needs runs here; the cache, the sheet and the heavy modules load in the background
         self.load_config()
-        self.authenticate_google_sheets()
-        self.load_sheet()
+        self.federation = Federation(self.termbase, self.sheet_sources)
+        self.ask_missing_config()
         self.setup_gui()
+        self.worker = SheetWorker(self.root, on_status=self.update_status)
+        self.load_sheet()
+        self.schedule_poll()
+        self.start_diagnostics_log()
 
     def load_config(self):
         if os.path.exists(CONFIG_FILE):
@@ -41,6 +86,13 @@ class SimpleTermOnline:
                 self.sheet_id = config.get('sheet_id')
                 self.json_keyfile_path = config.get('json_keyfile_path')
                 self.username = config.get('username')
+                self.worksheet_name = config.get('worksheet')
+                self.server_url = config.get('server_url')
+                self.server_token = config.get('server_token')
+                self.source_lang = config.get('source_lang')
+                self.target_lang = config.get('target_lang')
+                self.poll_interval = config.get('poll_interval', POLL_INTERVAL)
+                self.sheet_sources = [SheetSource.from_config(entry) for entry in config.get('sheets', [])]
 
     def save_config(self):
         config = {
@@ -48,17 +100,32 @@ class SimpleTermOnline:
             'json_keyfile_path': self.json_keyfile_path,
             'username': self.username
         }
+        if self.worksheet_name:
+            config['worksheet'] = self.worksheet_name
+        if self.server_url:
+            config['server_url'] = self.server_url
+        if self.server_token:
+            config['server_token'] = self.server_token
+        if self.source_lang:
+            config['source_lang'] = self.source_lang
+        if self.target_lang:
+            config['target_lang'] = self.target_lang
+        if self.poll_interval != POLL_INTERVAL:
+            config['poll_interval'] = self.poll_interval
+        if self.sheet_sources:
+            config['sheets'] = [source.to_config() for source in self.sheet_sources]
         with open(CONFIG_FILE, 'w') as file:
             json.dump(config, file)
 
-    def authenticate_google_sheets(self):
+    def ask_missing_config(self):
         try:
             if not self.sheet_id:
                 self.sheet_id = simpledialog.askstring("Google Sheets ID", "Enter the ID between 'd/' and the next '/' in the URL:")
                 if not self.sheet_id:
                     raise Exception("No Google Sheets ID entered")
 
-            if not self.json_keyfile_path:
+            # A term server talks to Google Sheets itself, so clients of one need no key file
+            if not self.json_keyfile_path and not self.server_url:
                 self.json_keyfile_path = filedialog.askopenfilename(
                     title="Select Google Sheets API Key File",
                     filetypes=[("JSON files", "*.json")]
@@ -72,64 +139,301 @@ class SimpleTermOnline:
                     raise Exception("No username entered")
 
             self.save_config()
-
-            scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-            creds = ServiceAccountCredentials.from_json_keyfile_name(self.json_keyfile_path, scope)
-            client = gspread.authorize(creds)
-            self.sheet = client.open_by_key(self.sheet_id).sheet1
         except Exception as e:
             messagebox.showerror("Error", f"Error authenticating with Google Sheets:\n{str(e)}")
             sys.exit()
 
-    def load_sheet(self):
-        try:
-            records = self.sheet.get_all_records()
-            self.df = pd.DataFrame(records)
-            
-            # Convert 'Reviewed' column to boolean
-            if 'Reviewed' in self.df.columns:
-                self.df['Reviewed'] = self.df['Reviewed'].apply(lambda x: str(x).strip().lower() == 'true')
-            
-        except Exception as e:
-            self.df = None
-            messagebox.showerror("Error", f"Error loading Google Sheet:\n{str(e)}")
-            sys.exit()
+    def open_sheet(self):
+        """ The main worksheet, authorized on first use; runs on the worker thread, never on the Tk thread. """
+        if self.sheet is None and self.server_url:
+            self.sheet = instrument(RemoteWorksheet(self.server_url, token=self.server_token))
+        elif self.sheet is None:
+            self.sheet = instrument(open_worksheet(self.sheet_id, self.json_keyfile_path, self.worksheet_name))
+        return self.sheet
+
+    @property
+    def sheet_key(self):
+        return cache_key(self.sheet_id, self.worksheet_name)
+
+    def load_sheet(self, glossaries=True):
+        # Read the local copy first and pick up remote changes after it, all off the Tk thread
+        key = self.sheet_key
+
+        def on_loaded(termbase):
+            # A sync that finished first has newer data than the cache
+            if termbase is not None and key == self.sheet_key and not self.termbase.loaded:
+                self.set_main_termbase(termbase)
+
+        self.worker.submit("Opening local copy", self.read_cached_termbase, key, True, on_success=on_loaded,
+                           on_error=lambda e: print(f"Error reading the local sheet cache: {str(e)}"))
+        self.flush_writes()
+        self.sync_sheet()
+        if glossaries:
+            for source in self.sheet_sources:
+                self.load_glossary_sheet(source)
+
+    def read_cached_termbase(self, key, with_pending=False):
+        """ A new TermBase from the local cache, or None if the sheet was never synced here. """
+        cached = self.sheet_cache.load(key)
+        if cached is None:
+            return None
+        return TermBase.from_rows(cached.header, cached.rows, self.journal.pending(key) if with_pending else ())
+
+    def set_main_termbase(self, termbase):
+        """ Swap in a term base built on the worker; its row IDs are new, so the results are looked up again. """
+        self.termbase = termbase
+        self.federation.main = termbase
+        self.index_in_background(termbase)
+        self.refresh_results()
+
+    def index_in_background(self, termbase):
+        """ Build the word indexes of a newly loaded term base on a worker, not at its first Target or Notes search. """
+        self.worker.submit("Indexing", TermBase.build_text_indexes, termbase.text_snapshot(), parallel=True,
+                           quiet=True, on_success=termbase.install_text_indexes,
+                           on_error=lambda e: print(f"Error indexing the sheet: {str(e)}"))
+
+    def sync_sheet(self, on_done=None, force=False):
+        generation = self.write_generation
+        key = self.sheet_key
+        reload = force or self.sheet_stale or not self.termbase.loaded
+
+        def sync():
+            # The new term base is built here and only swapped in on the Tk thread
+            result = self.sheet_cache.sync(key, self.open_sheet())
+            termbase = None
+            if result.changed or reload:
+                termbase = TermBase.from_rows(result.header, result.rows, self.journal.pending(key))
+            return result, termbase
+
+        def on_synced(synced):
+            result, termbase = synced
+            if key != self.sheet_key:
+                # The sheet was changed with F2 while this sync ran
+                return
+            if generation != self.write_generation and self.termbase.loaded:
+                self.sheet_stale = True
+                return
+            if termbase is None and (self.sheet_stale or not self.termbase.loaded):
+                # Went stale while this sync ran, after it decided not to build a term base
+                self.sync_sheet(on_done, force=True)
+                return
+            if termbase is not None:
+                self.sheet_stale = False
+                self.set_main_termbase(termbase)
+            if on_done is not None:
+                on_done(result)
+
+        self.worker.submit("Syncing with Google Sheets", sync, on_success=on_synced,
+                           on_error=lambda e: self.show_status(f"Error syncing Google Sheet: {str(e)}", error=True))
+
+    def load_glossary_sheet(self, source):
+        """ Show an extra glossary sheet from the cache, then sync it alongside the other sheets. """
+        def on_loaded(termbase):
+            if termbase is not None and not source.termbase.loaded:
+                source.termbase = termbase
+                self.index_in_background(termbase)
+                self.refresh_results()
+            self.sync_glossary_sheet(source)
+
+        def on_error(e):
+            print(f"Error reading the local cache of {source.label}: {str(e)}")
+            self.sync_glossary_sheet(source)
+
+        self.worker.submit(f"Opening {source.label}", self.read_cached_termbase, source.key, parallel=True,
+                           on_success=on_loaded, on_error=on_error)
+
+    def sync_glossary_sheet(self, source, force=False):
+        reload = force or not source.termbase.loaded
+
+        def sync():
+            result = source.sync(self.sheet_cache, self.json_keyfile_path)
+            termbase = None
+            if result.changed or reload:
+                termbase = TermBase.from_rows(result.header, result.rows)
+            return termbase
+
+        def on_synced(termbase):
+            if termbase is None or source not in self.sheet_sources:
+                return
+            source.termbase = termbase
+            self.index_in_background(termbase)
+            self.refresh_results()
+
+        self.worker.submit(f"Syncing {source.label}", sync, parallel=True, on_success=on_synced,
+                           on_error=lambda e: self.show_status(f"Error syncing {source.label}: {str(e)}", error=True))
+
+    def schedule_poll(self):
+        if self.poll_interval and self.poll_interval > 0:
+            self.root.after(int(self.poll_interval * 1000), self.poll_sheets)
+
+    def poll_sheets(self):
+        """ Look for teammates' changes in every sheet and merge only the rows that changed. """
+        self.poll_count += 1
+        verify = self.poll_count % FULL_CHECK_POLLS == 0
+        remaining = [1 + len(self.sheet_sources)]
+
+        # The next round is scheduled once this one is over, so slow polls never pile up
+        def on_done(*args):
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                self.schedule_poll()
+
+        self.poll_sheet(verify, on_done)
+        for source in list(self.sheet_sources):
+            self.poll_glossary_sheet(source, verify, on_done)
+
+    def poll_sheet(self, verify, on_done):
+        generation = self.write_generation
+        key = self.sheet_key
+
+        def on_polled(delta):
+            on_done()
+            if key != self.sheet_key:
+                return
+            if delta is not None and generation != self.write_generation:
+                # The rows were read before local writes reached the sheet; reload once they have
+                self.sheet_stale = True
+            elif self.sheet_stale:
+                self.sync_sheet(lambda result: self.refresh_results())
+            elif delta is not None:
+                # Rows found by a full checksum pass may have moved, so only a reload is safe then
+                if not delta.full and self.termbase.merge_rows(delta.header, delta.rows, delta.length,
+                                                               self.journal.pending(key)):
+                    self.refresh_results()
+                else:
+                    self.sync_sheet(lambda result: self.refresh_results(), force=True)
+
+        # Polls share the ordered queue with writes, so they always see the writes sent before them
+        self.worker.submit("Checking for changes", lambda: self.sheet_cache.poll(key, self.open_sheet(), verify),
+                           quiet=True, on_success=on_polled, on_error=on_done)
+
+    def poll_glossary_sheet(self, source, verify, on_done):
+        def on_polled(delta):
+            on_done()
+            if delta is None or source not in self.sheet_sources:
+                return
+            if not delta.full and source.termbase.merge_rows(delta.header, delta.rows, delta.length):
+                self.refresh_results()
+            else:
+                self.sync_glossary_sheet(source, force=True)
+
+        self.worker.submit(f"Checking {source.label} for changes", source.poll, self.sheet_cache,
+                           self.json_keyfile_path, verify, parallel=True, quiet=True,
+                           on_success=on_polled, on_error=on_done)
+
+    def queue_write(self, op):
+        """ Record a sheet write in the journal and try to send everything pending. """
+        # Syncs queued before this write would bring back the old row, so they must not replace local data
+        self.write_generation += 1
+        # Tagged with the sheet, so a switch with F2 before it is sent cannot send it to another sheet
+        seq = self.journal.append(dict(op, sheet=self.sheet_key))
+        # Deferred so that several writes made in one go are sent together
+        self.root.after_idle(self.flush_writes)
+        return seq
+
+    def row_update_op(self, index, changes, seen):
+        # 'expected' is the row as the user saw it, so a teammate's change merged since then is a conflict
+        add_id = self.termbase.pending_adds.get(index)
+        if add_id is not None and self.journal.is_pending(add_id):
+            return {'op': 'update', 'add_id': add_id, 'cells': changes}
+        if index not in self.termbase.sheet_rows:
+            raise ValueError("This entry's row on the Google Sheet is not known yet. Press F5 and try again.")
+        return {'op': 'update', 'row': self.termbase.sheet_rows[index], 'cells': changes,
+                'expected': {'Source Term': seen['Source Term'], 'Target Term': seen['Target Term']}}
+
+    def current_row(self, index, generation, seen):
+        """ Row ID now holding an entry read at the given term base generation, or None if it is gone. """
+        if generation == self.termbase.generation:
+            return index
+        # The term base was reloaded since, which gave out new row IDs
+        return self.termbase.find_row(seen['Source Term'], seen['Target Term'])
+
+    def flush_writes(self):
+        if self.flush_queued or not self.journal.count(self.sheet_key):
+            return
+        self.flush_queued = True
+        key = self.sheet_key
 
-    def refresh_sheet(self, event=None):
+        def on_error(e):
+            self.flush_queued = False
+            self.show_status(f"Error saving changes: {str(e)}", error=True)
+
+        self.worker.submit("Saving changes", self.replay_writes, key,
+                           on_success=self.on_writes_flushed, on_error=on_error)
+
+    def replay_writes(self, key):
         try:
-            self.df = None
-            self.load_sheet()
-            if self.df is not None:
-                self.results = []
-                self.update_display()
-                self.root.title("Updated!")
-                self.root.after(2000, lambda: self.root.title("SimpleTerm Online"))
-            else:
-                messagebox.showwarning("Update Error", "Failed to refresh data from Google Sheets.")
+            sheet = self.open_sheet()
         except Exception as e:
-            messagebox.showerror("Error", f"Error refreshing data from Google Sheets:\n{str(e)}")
-
-    def find_equivalent(self, term):
-        results = []
-        if self.df is not None:
-            for index, row in self.df.iterrows():
-                if row['Source Term'].lower() == term.lower():
-                    notes = row['Notes']
-                    reviewed = row.get('Reviewed', False)
-                    if pd.isna(notes):
-                        notes = ""
-                    results.append({
-                        'target_term': row['Target Term'],
-                        'notes': notes,
-                        'reviewed': reviewed
-                    })
-        return results
+            # Not signed in yet, e.g. offline at startup: keep the writes and try again later
+            return ReplayReport([], [], e)
+        if key != self.sheet_key:
+            # F2 switched sheets since the flush was queued; the writes wait for their own sheet
+            return ReplayReport([], [], None)
+        report = self.journal.replay(sheet, key)
+        if report.saved:
+            # The term base has these writes already, so the cache takes them too instead of a poll
+            # reading them back; the sheet's revision is only taken as seen when nothing went amiss
+            clean = report.error is None and not report.rejected and \
+                not any('relocated_from' in op for op in report.saved)
+            self.sheet_cache.record_writes(key, report.saved, fetch_revision(sheet) if clean else None)
+        return report
+
+    def on_writes_flushed(self, report):
+        self.flush_queued = False
+        added_rows = {seq: index for index, seq in self.termbase.pending_adds.items()}
+        for op in report.saved:
+            if op['op'] == 'add' and op.get('row') and op['seq'] in added_rows:
+                self.termbase.set_sheet_row(added_rows[op['seq']], op['row'])
+        if any('relocated_from' in op for op in report.saved):
+            # Rows moved on the sheet, so the row map is out of date
+            self.sync_sheet()
+
+        if report.rejected:
+            # Rebuild local data from the sheet so the rejected changes disappear
+            self.sync_sheet(lambda result: self.refresh_results(), force=True)
+            op, reason = report.rejected[0]
+            self.show_status(f"{len(report.rejected)} change(s) could not be saved and were reverted: {reason}", error=True)
+        elif report.error is not None:
+            self.show_status(f"Offline, {self.journal.count(self.sheet_key)} change(s) waiting to be saved.",
+                             error=True)
+            self.root.after(RETRY_INTERVAL_MS, self.flush_writes)
+        elif self.journal.count(self.sheet_key):
+            self.flush_writes()
+        elif report.saved:
+            self.show_status("All changes saved.")
 
+    def refresh_sheet(self, event=None):
+        def on_refreshed(result):
+            self.refresh_results()
+            self.root.title("Updated!")
+            self.root.after(2000, lambda: self.root.title("SimpleTerm Online"))
+
+        self.sync_sheet(on_refreshed)
+        for source in self.sheet_sources:
+            self.sync_glossary_sheet(source)
+
+    def show_status(self, text, error=False):
+        self.status_label.config(text=text, fg='red' if error else 'gray')
+
+    def update_status(self, pending):
+        if pending:
+            text = f"{pending[0]}..."
+            if len(pending) > 1:
+                text += f" ({len(pending) - 1} more queued)"
+            self.show_status(text)
+        elif self.status_label.cget('fg') != 'red':
+            self.show_status('')
+
+    @timed('ui.search')
     def search_term(self, event=None):
+        if self.suggestion_list.curselection():
+            self.accept_suggestion()
+        self.hide_suggestions()
         term = self.entry.get().strip()
-        if term and self.df is not None:
+        if term and self.termbase.loaded:
             try:
-                self.results = self.find_equivalent(term)
+                self.results = self.find_results(term)
                 self.current_index = 0
                 self.update_display()
                 self.current_search_term = term
@@ -139,60 +443,182 @@ class SimpleTermOnline:
         else:
             messagebox.showwarning("Input Error", "Please enter a term to search or load the Google Sheet first.")
 
+    def refresh_results(self):
+        """ Re-run the current search against local data, keeping the navigation position. """
+        if self.current_search_term:
+            self.results = self.find_results(self.current_search_term)
+            self.current_index = min(self.current_index, max(len(self.results) - 1, 0))
+        self.update_display()
+
+    def find_results(self, term):
+        """ Entries with term as source term, or in the Target and Notes modes, ranked word matches in that column. """
+        if self.search_mode == SEARCH_MODES[0]:
+            return self.federation.find_equivalent(term)
+        return self.federation.search_text(SEARCH_COLUMNS[self.search_mode], term)
+
+    def toggle_search_mode(self, event=None):
+        self.set_search_mode(SEARCH_MODES[(SEARCH_MODES.index(self.search_mode) + 1) % len(SEARCH_MODES)])
+        if self.entry.get().strip() and self.termbase.loaded:
+            self.search_term()
+        return 'break'
+
+    def set_search_mode(self, mode):
+        self.search_mode = mode
+        self.mode_button.config(text=mode)
+        self.hide_suggestions()
+
+    def schedule_suggestions(self, event=None):
+        if event is not None and event.keysym in ('Return', 'Escape', 'Up', 'Down', 'Left', 'Right', 'Tab'):
+            return
+        # Suggestions complete source terms, so only the source search offers them
+        if self.search_mode != SEARCH_MODES[0]:
+            return
+        if self.suggest_job is not None:
+            self.root.after_cancel(self.suggest_job)
+        self.suggest_job = self.root.after(SUGGEST_DELAY_MS, self.update_suggestions)
+
+    @timed('ui.suggestions')
+    def update_suggestions(self):
+        self.suggest_job = None
+        text = self.entry.get().strip()
+        suggestions = self.federation.suggest(text) if text else []
+        if not suggestions or suggestions == [text]:
+            self.hide_suggestions()
+            return
+
+        self.suggestion_list.delete(0, tk.END)
+        for suggestion in suggestions:
+            self.suggestion_list.insert(tk.END, suggestion)
+        self.suggestion_list.config(height=len(suggestions))
+
+        x = self.entry.winfo_rootx()
+        y = self.entry.winfo_rooty() + self.entry.winfo_height()
+        self.suggestion_popup.geometry(f"+{x}+{y}")
+        self.suggestion_popup.deiconify()
+        self.suggestion_popup.lift()
+
+    def hide_suggestions(self, event=None):
+        if self.suggest_job is not None:
+            self.root.after_cancel(self.suggest_job)
+            self.suggest_job = None
+        self.suggestion_list.selection_clear(0, tk.END)
+        self.suggestion_popup.withdraw()
+
+    def move_suggestion(self, event):
+        size = self.suggestion_list.size()
+        if not size or not self.suggestion_popup.winfo_viewable():
+            return
+        selection = self.suggestion_list.curselection()
+        if selection:
+            step = 1 if event.keysym == 'Down' else -1
+            position = (selection[0] + step) % size
+        else:
+            position = 0 if event.keysym == 'Down' else size - 1
+        self.suggestion_list.selection_clear(0, tk.END)
+        self.suggestion_list.selection_set(position)
+        self.suggestion_list.see(position)
+        return 'break'
+
+    def accept_suggestion(self, event=None):
+        selection = self.suggestion_list.curselection()
+        if selection:
+            self.entry.delete(0, tk.END)
+            self.entry.insert(0, self.suggestion_list.get(selection[0]))
+        if event is not None:
+            self.entry.focus_set()
+            self.search_term()
+
     def update_display(self):
+        """ Show the current result once Tk is idle; changes made before then are drawn together. """
+        if self.render_job is None:
+            self.render_job = self.root.after_idle(self.render_result)
+
+    @timed('ui.render_result')
+    def render_result(self):
+        # Only options that differ from what is on screen are set, so holding an arrow key stays cheap
+        self.render_job = None
         if self.results:
             result = self.results[self.current_index]
-            self.result_label.config(text=result['target_term'])
-
             notes_text = result['notes'] if result['notes'] else ""
-            self.notes_text.config(state=tk.NORMAL)
-            self.notes_text.delete(1.0, tk.END)
-            self.notes_text.insert(tk.END, notes_text)
-            self.notes_text.config(state=tk.DISABLED)
+            if result.get('sheet'):
+                notes_text = f"[{result['sheet']}] {notes_text}".strip()
 
+            # Decoded once per font size, so navigating through results reads no files
+            icon = None
             if result['reviewed']:
-                try:
-                    icon_path = self.resource_path('checkmark.png')
-                    icon = Image.open(icon_path)
-                    icon = icon.resize((16, 16))
-                    self.reviewed_icon = ImageTk.PhotoImage(icon)
-                    self.result_label.config(image=self.reviewed_icon, compound=tk.RIGHT)
-                except Exception as e:
-                    print(f"Error loading icon: {str(e)}")
-            else:
-                self.result_label.config(image='', compound=tk.NONE)
-
-            self.result_label.config(fg='blue' if len(self.results) > 1 else 'black')
+                icon = self.assets.image('checkmark.png', icon_size(self.font_size(self.result_label)))
+            text = result['target_term']
+            if self.search_mode != SEARCH_MODES[0]:
+                text = f"{result['source_term']} \u2192 {text}"
+            view = {'text': text, 'image': icon if icon is not None else '',
+                    'compound': tk.RIGHT if icon is not None else tk.NONE,
+                    'fg': 'blue' if len(self.results) > 1 else 'black'}
         else:
-            self.result_label.config(text='Term not found.', image='', compound=tk.NONE)
+            notes_text = ""
+            view = {'text': 'Term not found.', 'image': '', 'compound': tk.NONE}
+
+        changes = {option: value for option, value in view.items()
+                   if option not in self.rendered or self.rendered[option] != value}
+        if changes:
+            self.result_label.config(**changes)
+            self.rendered.update(changes)
+        if notes_text != self.rendered_notes:
             self.notes_text.config(state=tk.NORMAL)
             self.notes_text.delete(1.0, tk.END)
+            self.notes_text.insert(tk.END, notes_text)
             self.notes_text.config(state=tk.DISABLED)
+            self.rendered_notes = notes_text
 
-        self.root.update_idletasks()
-        self.root.geometry(f"{self.root.winfo_width()}x{self.root.winfo_height()}")
+        # Fix the window at its size once it is shown, so long results or status text never resize it
+        if not self.window_pinned and self.root.winfo_ismapped():
+            self.root.geometry(f"{self.root.winfo_width()}x{self.root.winfo_height()}")
+            self.window_pinned = True
 
     def download_sheet(self, event=None):
-        if self.sheet is None:
+        if not self.termbase.loaded:
             messagebox.showwarning("Download Error", "Google Sheet is not loaded.")
             return
 
-        try:
-            data = self.sheet.get_all_records()
-            now = datetime.datetime.now()
-            timestamp = now.strftime("%Y%m%d_%H%M%S")
-
-            filename = f'downloaded_sheet_{timestamp}.csv'
-
-            with open(filename, 'w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow(self.df.columns)
-                for row in data:
-                    writer.writerow(row.values())
-
-            messagebox.showinfo("Download Success", f"Sheet downloaded successfully as {filename}.")
-        except Exception as e:
-            messagebox.showerror("Error", f"Error downloading Google Sheet:\n{str(e)}")
+        filename = filedialog.asksaveasfilename(
+            title="Download Sheet",
+            initialfile=default_filename('csv'),
+            defaultextension='.csv',
+            filetypes=[("CSV files", "*.csv"), ("Excel workbooks", "*.xlsx"), ("TBX termbases", "*.tbx")]
+        )
+        if not filename:
+            return
+        if os.path.splitext(filename)[1].lower().lstrip('.') not in EXPORT_FORMATS:
+            messagebox.showwarning("Download Error", "Please save the sheet as a .csv, .xlsx or .tbx file.")
+            return
+        options = {}
+        if export_format(filename) == 'tbx':
+            # TBX names the language of each term; asked for once and kept in config.json
+            if not self.source_lang or not self.target_lang:
+                source_lang = (simpledialog.askstring("Languages", "Language code of the source terms, e.g. en:",
+                                                      initialvalue=self.source_lang or '') or '').strip()
+                if not source_lang:
+                    return
+                target_lang = (simpledialog.askstring("Languages", "Language code of the target terms, e.g. tr:",
+                                                      initialvalue=self.target_lang or '') or '').strip()
+                if not target_lang:
+                    return
+                self.source_lang = source_lang
+                self.target_lang = target_lang
+                self.save_config()
+            options = {'source_lang': self.source_lang, 'target_lang': self.target_lang}
+
+        # Export the local copy, which matches the sheet after the last sync, without another download.
+        # The rows are copied here, as edits and syncs on the Tk thread change the term base during the export
+        rows = list(self.termbase.iter_rows())
+        total = len(rows)
+
+        def on_progress(count):
+            self.worker.call_soon(self.show_status, f"Downloading sheet... {count} of {total} rows")
+
+        self.worker.submit("Downloading sheet", partial(export_rows, **options), rows, filename,
+                           on_progress,
+                           on_success=lambda count: self.show_status(f"Sheet downloaded successfully as {filename}."),
+                           on_error=lambda e: self.show_status(f"Error downloading Google Sheet: {str(e)}", error=True))
 
     def setup_gui(self):
         if self.sheet_id:
@@ -205,13 +631,29 @@ class SimpleTermOnline:
         input_frame.pack(padx=10, pady=10, fill=tk.X)
         input_frame.pack_propagate(False)
 
+        self.mode_button = tk.Button(input_frame, text=self.search_mode, font=('Arial', 9), relief=tk.FLAT,
+                                     width=6, command=self.toggle_search_mode)
+        self.mode_button.grid(row=0, column=0, padx=(0, 5))
+
         self.entry = tk.Entry(input_frame, font=('Arial', 14), relief=tk.FLAT, width=20)
-        self.entry.grid(row=0, column=0, padx=(0, 10), sticky='ew')
+        self.entry.grid(row=0, column=1, padx=(0, 10), sticky='ew')
 
         self.result_label = tk.Label(input_frame, text='', font=('Arial', 14), anchor='w', bg='#f0f0f0')
-        self.result_label.grid(row=0, column=1, padx=(10, 0), sticky='ew')
+        self.result_label.grid(row=0, column=2, padx=(10, 0), sticky='ew')
+
+        input_frame.grid_columnconfigure(1, weight=0)
 
-        input_frame.grid_columnconfigure(0, weight=0)
+        self.status_label = tk.Label(self.root, text='', font=('Arial', 9), anchor='w', bg='#f0f0f0', fg='gray')
+        self.status_label.pack(side=tk.BOTTOM, padx=10, fill=tk.X)
+
+        self.suggestion_popup = tk.Toplevel(self.root)
+        self.suggestion_popup.overrideredirect(True)
+        self.suggestion_popup.attributes('-topmost', True)
+        self.suggestion_popup.withdraw()
+        self.suggestion_list = tk.Listbox(self.suggestion_popup, font=('Arial', 12), relief=tk.FLAT,
+                                          activestyle='none', exportselection=False)
+        self.suggestion_list.pack(fill=tk.BOTH, expand=True)
+        self.suggestion_list.bind('<ButtonRelease-1>', self.accept_suggestion)
 
         result_frame = tk.Frame(self.root, padx=10, pady=0, bg='#f0f0f0')
         result_frame.pack(padx=10, pady=0, fill=tk.BOTH, expand=True)
@@ -220,6 +662,11 @@ class SimpleTermOnline:
         result_frame.pack_propagate(False)
 
         self.entry.bind('<Return>', self.search_term)
+        self.entry.bind('<KeyRelease>', self.schedule_suggestions)
+        self.entry.bind('<Down>', self.move_suggestion)
+        self.entry.bind('<Up>', self.move_suggestion)
+        self.entry.bind('<Escape>', self.hide_suggestions)
+        self.entry.bind('<FocusOut>', lambda event: self.root.after(150, self.hide_suggestions))
         self.root.bind('<Control-n>', lambda event: self.open_add_term_dialog())
         self.root.bind('<Control-o>', lambda event: self.open_google_sheet())
         self.root.bind('<Right>', self.navigate_results)
@@ -232,10 +679,15 @@ class SimpleTermOnline:
         self.root.bind('<Control-Shift-minus>', self.decrease_notes_font_size)
         self.root.bind('<F5>', self.refresh_google_sheet)
         self.root.bind('<F3>', self.display_help)
+        self.root.bind('<F4>', self.open_diagnostics)
         self.root.bind('<F2>', self.change_sheet_config)
+        self.root.bind('<Control-g>', self.manage_glossary_sheets)
         self.root.bind('<Control-d>', self.download_sheet)
         self.root.bind('<Control-e>', self.open_edit_entry_dialog)
         self.root.bind('<Control-r>', self.open_reviewer_mode)
+        self.root.bind('<Control-t>', self.open_term_check)
+        self.root.bind('<Control-m>', self.toggle_search_mode)
+        self.root.bind('<Control-u>', self.open_duplicate_report)
 
         self.entry.focus_set()
         self.root.after(100, self.entry.focus_force)
@@ -255,21 +707,31 @@ class SimpleTermOnline:
             new_sheet_id = sheet_id_entry.get().strip()
             new_keyfile_path = keyfile_path_entry.get().strip()
 
-            if new_sheet_id and new_keyfile_path:
+            # Through a term server only the server needs a key file
+            if new_sheet_id and (new_keyfile_path or self.server_url):
+                keyfile_changed = new_keyfile_path != (self.json_keyfile_path or '')
                 self.sheet_id = new_sheet_id
-                self.json_keyfile_path = new_keyfile_path
+                self.worksheet_name = worksheet_entry.get().strip() or None
+                self.json_keyfile_path = new_keyfile_path or None
                 self.save_config()  # Save the new configuration
-                self.authenticate_google_sheets()  # Re-authenticate with the new credentials
+                # Sign in again with the new credentials and show the new sheet
+                self.sheet = None
+                self.sheet_stale = False
+                self.termbase = TermBase()
+                self.federation.main = self.termbase
+                # Glossary sheets only need reading again when they are read with other credentials
+                self.load_sheet(glossaries=keyfile_changed)
                 messagebox.showinfo("Success", "Configuration updated successfully.")
                 config_dialog.destroy()
             else:
-                messagebox.showwarning("Missing Fields", "Please enter both Google Sheet ID and JSON key file path.")
+                messagebox.showwarning("Missing Fields", "Please enter the Google Sheet ID and, unless a term server "
+                                                         "is configured, the JSON key file path.")
 
         config_dialog = tk.Toplevel(self.root)
         config_dialog.title("Change Google Sheet Config")
 
         dialog_width = 450
-        dialog_height = 100
+        dialog_height = 135
 
         screen_width = config_dialog.winfo_screenwidth()
         screen_height = config_dialog.winfo_screenheight()
@@ -284,12 +746,18 @@ class SimpleTermOnline:
         sheet_id_entry.grid(row=0, column=1, padx=10, pady=5)
         sheet_id_entry.insert(0, self.sheet_id if self.sheet_id else "")
 
-        tk.Label(config_dialog, text="JSON Key File Path:").grid(row=1, column=0, padx=10, pady=5, sticky='e')
+        # Blank means the first worksheet of the sheet
+        tk.Label(config_dialog, text="Worksheet:").grid(row=1, column=0, padx=10, pady=5, sticky='e')
+        worksheet_entry = tk.Entry(config_dialog, width=50, relief=tk.FLAT)
+        worksheet_entry.grid(row=1, column=1, padx=10, pady=5)
+        worksheet_entry.insert(0, self.worksheet_name if self.worksheet_name else "")
+
+        tk.Label(config_dialog, text="JSON Key File Path:").grid(row=2, column=0, padx=10, pady=5, sticky='e')
         keyfile_path_entry = tk.Entry(config_dialog, width=50, relief=tk.FLAT)
-        keyfile_path_entry.grid(row=1, column=1, padx=10, pady=5)
+        keyfile_path_entry.grid(row=2, column=1, padx=10, pady=5)
         keyfile_path_entry.insert(0, self.json_keyfile_path if self.json_keyfile_path else "")
 
-        tk.Button(config_dialog, text="Save", command=save_changes).grid(row=2, column=1, padx=10, pady=10, sticky='e')
+        tk.Button(config_dialog, text="Save", command=save_changes).grid(row=3, column=1, padx=10, pady=10, sticky='e')
 
         config_dialog.bind('<Return>', lambda event: save_changes())
         config_dialog.bind('<Escape>', lambda event: config_dialog.destroy())
@@ -299,15 +767,100 @@ class SimpleTermOnline:
         config_dialog.focus_set()
         sheet_id_entry.focus()
 
+    def manage_glossary_sheets(self, event=None):
+        def describe(source):
+            location = f"{source.sheet_id} / {source.worksheet}" if source.worksheet else source.sheet_id
+            return f"{source.label}  ({location})"
+
+        def render():
+            sheet_list.delete(0, tk.END)
+            for source in self.sheet_sources:
+                sheet_list.insert(tk.END, describe(source))
+
+        def add_sheet():
+            sheet_id = sheet_id_entry.get().strip()
+            worksheet = worksheet_entry.get().strip()
+            if not sheet_id:
+                messagebox.showwarning("Missing Fields", "Please enter a Google Sheet ID.", parent=sheets_dialog)
+                return
+            source = SheetSource(sheet_id, worksheet, label_entry.get().strip())
+            if source.key == self.sheet_key or any(other.key == source.key for other in self.sheet_sources):
+                messagebox.showwarning("Glossary Sheets", "This sheet is already in use.", parent=sheets_dialog)
+                return
+            self.sheet_sources.append(source)
+            self.save_config()
+            self.load_glossary_sheet(source)
+            for entry in (sheet_id_entry, worksheet_entry, label_entry):
+                entry.delete(0, tk.END)
+            render()
+
+        def remove_sheet():
+            selection = sheet_list.curselection()
+            if selection:
+                del self.sheet_sources[selection[0]]
+                self.save_config()
+                self.refresh_results()
+                render()
+
+        def move_up():
+            selection = sheet_list.curselection()
+            if selection and selection[0] > 0:
+                position = selection[0]
+                self.sheet_sources[position - 1:position + 1] = self.sheet_sources[position - 1:position + 1][::-1]
+                self.save_config()
+                self.refresh_results()
+                render()
+                sheet_list.selection_set(position - 1)
+
+        sheets_dialog = tk.Toplevel(self.root)
+        sheets_dialog.title("Glossary Sheets")
+
+        tk.Label(sheets_dialog, text="Searched after the main sheet, in this order:").grid(
+            row=0, column=0, columnspan=3, padx=10, pady=(10, 0), sticky='w')
+        sheet_list = tk.Listbox(sheets_dialog, width=60, height=6, relief=tk.FLAT, exportselection=False)
+        sheet_list.grid(row=1, column=0, columnspan=2, padx=10, pady=5, sticky='nsew')
+        buttons = tk.Frame(sheets_dialog)
+        buttons.grid(row=1, column=2, padx=(0, 10), pady=5, sticky='n')
+        tk.Button(buttons, text="Move Up", command=move_up).pack(fill=tk.X)
+        tk.Button(buttons, text="Remove", command=remove_sheet).pack(fill=tk.X, pady=5)
+
+        tk.Label(sheets_dialog, text="Google Sheet ID:").grid(row=2, column=0, padx=10, pady=5, sticky='e')
+        sheet_id_entry = tk.Entry(sheets_dialog, width=50, relief=tk.FLAT)
+        sheet_id_entry.grid(row=2, column=1, padx=10, pady=5)
+
+        tk.Label(sheets_dialog, text="Worksheet (optional):").grid(row=3, column=0, padx=10, pady=5, sticky='e')
+        worksheet_entry = tk.Entry(sheets_dialog, width=50, relief=tk.FLAT)
+        worksheet_entry.grid(row=3, column=1, padx=10, pady=5)
+
+        tk.Label(sheets_dialog, text="Label (optional):").grid(row=4, column=0, padx=10, pady=5, sticky='e')
+        label_entry = tk.Entry(sheets_dialog, width=50, relief=tk.FLAT)
+        label_entry.grid(row=4, column=1, padx=10, pady=5)
+
+        tk.Button(sheets_dialog, text="Add", command=add_sheet).grid(row=5, column=1, padx=10, pady=10, sticky='e')
+
+        sheets_dialog.bind('<Return>', lambda event: add_sheet())
+        sheets_dialog.bind('<Escape>', lambda event: sheets_dialog.destroy())
+
+        render()
+        sheets_dialog.transient(self.root)
+        sheets_dialog.grab_set()
+        sheets_dialog.focus_set()
+        sheet_id_entry.focus()
+
     def open_edit_entry_dialog(self, event=None):
         if not self.results:
             messagebox.showwarning("No Results", "No results available to edit.")
             return
 
         result = self.results[self.current_index]
-        current_source_term = self.current_search_term
+        if result.get('sheet'):
+            messagebox.showwarning("Read-only Entry", f"This entry comes from the {result['sheet']} glossary. "
+                                                      "Open that sheet to edit it.")
+            return
+        current_source_term = result['source_term']
         current_target_term = result['target_term']
         current_notes = result['notes']
+        generation = self.termbase.generation
         user_info = self.username
 
         
@@ -319,27 +872,29 @@ class SimpleTermOnline:
 
             if new_source_term and new_target_term:
                 try:
-                    # Find the row index for the current entry
-                    index = self.df[(self.df['Source Term'] == current_source_term) &
-                                    (self.df['Target Term'] == current_target_term)].index[0]
-
-                    # Update the DataFrame
-                    self.df.at[index, 'Source Term'] = new_source_term
-                    self.df.at[index, 'Target Term'] = new_target_term
-                    self.df.at[index, 'Notes'] = new_notes
-                    self.df.at[index, 'User Info'] = user_info
-
-                    # Update the Google Sheet
-                    self.sheet.update_cell(index + 2, 1, new_source_term)  # Column 1 for 'Source Term'
-                    self.sheet.update_cell(index + 2, 2, new_target_term)  # Column 2 for 'Target Term'
-                    self.sheet.update_cell(index + 2, 3, new_notes)  # Column 3 for 'Notes'
-                    self.sheet.update_cell(index + 2, 4, user_info)
-
-                    messagebox.showinfo("Success", "Entry updated successfully.")
+                    seen = {'Source Term': current_source_term, 'Target Term': current_target_term}
+                    index = self.current_row(result['row'], generation, seen)
+                    if index is None:
+                        messagebox.showwarning("Entry Changed", "This entry was changed or removed on the Google Sheet "
+                                                                "while you edited it. Search for it again and retry.",
+                                               parent=edit_dialog)
+                        return
+                    changes = {
+                        'Source Term': new_source_term,
+                        'Target Term': new_target_term,
+                        'Notes': new_notes,
+                        self.termbase.user_column: user_info
+                    }
+
+                    # Journal the write first, then show the change right away
+                    self.queue_write(self.row_update_op(index, changes, seen))
+                    self.termbase.apply_row_update(index, changes)
+                    if self.search_mode == SEARCH_MODES[0]:
+                        self.current_search_term = new_source_term
+                    self.refresh_results()
                     edit_dialog.destroy()
-                    self.refresh_sheet()  # Refresh the display to show updated data
                 except Exception as e:
-                    messagebox.showerror("Error", f"Error updating Google Sheet:\n{str(e)}")
+                    messagebox.showerror("Error", f"Error updating entry:\n{str(e)}")
             else:
                 messagebox.showwarning("Missing Fields", "Please enter both Source Term and Target Term.")
 
@@ -390,21 +945,31 @@ class SimpleTermOnline:
 
     def copy_result_term(self, event):
         if self.results:
+            import pyperclip
             pyperclip.copy(self.results[self.current_index]['target_term'])
             self.result_label.config(bg='green')
             self.root.after(500, lambda: self.result_label.config(bg=self.root.cget('bg')))
 
+    @staticmethod
+    def font_size(widget):
+        return int(widget.cget('font').split()[1])
+
     def increase_font_size(self, event=None):
-        current_font_size = int(self.entry.cget('font').split()[1])
+        current_font_size = self.font_size(self.entry)
         new_font_size = current_font_size + 1
         self.entry.config(font=('Arial', new_font_size))
         self.result_label.config(font=('Arial', new_font_size))
+        if self.results:
+            # Picks the checkmark for the new size
+            self.update_display()
 
     def decrease_font_size(self, event=None):
-        current_font_size = int(self.entry.cget('font').split()[1])
+        current_font_size = self.font_size(self.entry)
         new_font_size = max(current_font_size - 1, 8)
         self.entry.config(font=('Arial', new_font_size))
         self.result_label.config(font=('Arial', new_font_size))
+        if self.results:
+            self.update_display()
 
     def increase_notes_font_size(self, event=None):
         current_font_size = int(self.notes_text.cget('font').split()[1])
@@ -423,50 +988,145 @@ class SimpleTermOnline:
         help_text = (
             "Shortcuts\n"
             "Tab Key, Left and Right arrows: Navigate between results\n"
+            "Up and Down arrows: Pick a suggestion while typing\n"
             "Ctrl+C: Copy the displayed result\n"
             "Ctrl+N: Add a new term\n"
             "Ctrl+O: Open the used Google Sheet\n"
             "Ctrl+E: Edit the searched entry"
-            "Ctrl+D: Download the sheet as a .csv"
-            "Ctrl+R Open the reviewer mode"
+            "Ctrl+D: Download the sheet as a .csv, .xlsx or .tbx"
+            "Ctrl+R Open the reviewer mode\n"
+            "Ctrl+T: Check a document against the term base\n"
+            "Ctrl+M: Search source terms, words of target terms or words of notes\n"
+            "Ctrl+U: List duplicated entries and conflicting targets\n"
             "Ctrl++/-: Increase or decrease the font size\n"
             "Ctrl+Shift++/-: Increase or decrease the notes font size\n"
             "F5: Refresh the Google Sheet\n"
             "F3: Display this help\n"
-            "F2: Change the sheet being used"
+            "F4: Show timings and Google Sheets API usage\n"
+            "F2: Change the sheet being used\n"
+            "Ctrl+G: Add or remove glossary sheets searched with the main sheet"
         )
         messagebox.showinfo("Help", help_text)
 
+    def start_diagnostics_log(self):
+        try:
+            setup_log()
+        except OSError as e:
+            print(f"Error opening the diagnostics log: {str(e)}")
+            return
+
+        def write_snapshot():
+            log_snapshot()
+            self.root.after(LOG_SNAPSHOT_MS, write_snapshot)
+
+        self.root.after(LOG_SNAPSHOT_MS, write_snapshot)
+
+    def open_diagnostics(self, event=None):
+        diagnostics_window = tk.Toplevel(self.root)
+        diagnostics_window.title("Diagnostics")
+
+        quota_label = tk.Label(diagnostics_window, text='', anchor='w', justify=tk.LEFT)
+        quota_label.pack(fill=tk.X, padx=10, pady=(10, 0))
+
+        frame = tk.Frame(diagnostics_window)
+        frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        columns = ('count', 'errors', 'mean', 'p50', 'p95', 'max')
+        tree = ttk.Treeview(frame, columns=columns, height=15, selectmode='browse')
+        tree.heading('#0', text='Operation')
+        tree.column('#0', width=260)
+        for column, title in zip(columns, ('Calls', 'Errors', 'Mean ms', 'p50 ms', 'p95 ms', 'Max ms')):
+            tree.heading(column, text=title)
+            tree.column(column, width=70, anchor=tk.E)
+        scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        controls = tk.Frame(diagnostics_window)
+        controls.pack(fill=tk.X, padx=10, pady=(0, 10))
+        tk.Label(controls, text=f"Logged to {os.path.abspath(DIAGNOSTICS_LOG)}", fg='gray').pack(side=tk.LEFT)
+
+        def refresh():
+            if not diagnostics_window.winfo_exists():
+                return
+            snapshot = metrics.snapshot()
+            quota = metrics.quota()
+            quota_label.config(text=f"Sheets API requests in the last minute: {quota['read'][0]} of {quota['read'][1]} reads, "
+                                    f"{quota['write'][0]} of {quota['write'][1]} writes. "
+                                    f"Rate limited {snapshot['rate_limited']} times since start.")
+            for name, summary in snapshot['operations'].items():
+                values = (summary['count'], summary['errors'], f"{summary['mean_ms']:.1f}",
+                          f"{summary['p50_ms']:.0f}", f"{summary['p95_ms']:.0f}", f"{summary['max_ms']:.1f}")
+                if tree.exists(name):
+                    tree.item(name, values=values)
+                else:
+                    tree.insert('', tk.END, iid=name, text=name, values=values)
+            diagnostics_window.after(DIAGNOSTICS_REFRESH_MS, refresh)
+
+        def reset():
+            metrics.reset()
+            tree.delete(*tree.get_children())
+
+        tk.Button(controls, text="Reset", command=reset).pack(side=tk.RIGHT)
+
+        diagnostics_window.bind('<Escape>', lambda event: diagnostics_window.destroy())
+        refresh()
+
     def open_add_term_dialog(self, event=None):
+        if not self.termbase.loaded:
+            messagebox.showwarning("Add New Term", "The Google Sheet is not loaded yet.")
+            return
+
         def save_term():
             source_term = source_entry.get().strip()
             target_term = target_entry.get().strip()
             notes = notes_entry.get().strip()
 
-            if source_term and target_term:
+            if not self.termbase.loaded:
+                # F2 switched sheets while the dialog was open
+                messagebox.showwarning("Add New Term", "The Google Sheet is not loaded yet.", parent=new_term_dialog)
+            elif source_term and target_term:
+                # Checked against the local index only, so a duplicate is caught without a network round trip
+                check = self.termbase.check_new_term(source_term, target_term)
+                if (check.duplicates or check.conflicts) and not messagebox.askyesno(
+                        "Duplicate Term", f"{self.describe_term_check(check)}\n\nAdd it anyway?",
+                        parent=new_term_dialog):
+                    return
                 new_data = {
                     'Source Term': source_term,
                     'Target Term': target_term,
                     'Notes': notes if notes else '',
-                    'Username': self.username,
+                    self.termbase.user_column: self.username,
                     'Reviewed': False
                 }
 
+                # Make the term searchable first and journal it only once that worked, so a failure
+                # cannot leave a journaled add behind that Enter would then repeat
+                index = self.termbase.append_row(new_data)
                 try:
-                    self.sheet.append_row([source_term, target_term, new_data['Notes'], new_data['Username'], new_data['Reviewed']])
-                    self.root.title("Updated!")
-                    self.root.after(2000, lambda: self.root.title("SimpleTerm Online"))
-                    new_term_dialog.destroy()
+                    seq = self.queue_write({'op': 'add', 'values': new_data})
                 except Exception as e:
-                    messagebox.showerror("Error", f"Error saving to Google Sheet:\n{str(e)}")
+                    self.termbase.remove_row(index)
+                    messagebox.showerror("Error", f"Error saving the new term:\n{str(e)}", parent=new_term_dialog)
+                    return
+                self.termbase.pending_adds[index] = seq
+                self.refresh_results()
+                self.root.title("Updated!")
+                self.root.after(2000, lambda: self.root.title("SimpleTerm Online"))
+                new_term_dialog.destroy()
             else:
                 messagebox.showwarning("Missing Fields", "Please enter Source Term and Target Term.")
 
+        def update_warning(event=None):
+            check = self.termbase.check_new_term(source_entry.get().strip(), target_entry.get().strip())
+            warning_label.config(text=self.describe_term_check(check),
+                                 fg='red' if check.duplicates or check.conflicts else 'gray')
+
         new_term_dialog = tk.Toplevel(self.root)
         new_term_dialog.title("Add New Term")
 
         dialog_width = 400
-        dialog_height = 100
+        dialog_height = 125
 
         screen_width = new_term_dialog.winfo_screenwidth()
         screen_height = new_term_dialog.winfo_screenheight()
@@ -488,10 +1148,17 @@ class SimpleTermOnline:
         notes_entry = tk.Entry(new_term_dialog, width=40, relief=tk.FLAT)
         notes_entry.grid(row=2, column=1, padx=10, pady=5)
 
-        new_term_dialog.bind('<Return>', lambda event: [save_term(), self.refresh_sheet()])
+        warning_label = tk.Label(new_term_dialog, text='', anchor='w', wraplength=370, justify=tk.LEFT)
+        warning_label.grid(row=3, column=0, columnspan=2, padx=10, sticky='w')
+
+        new_term_dialog.bind('<Return>', lambda event: save_term())
         new_term_dialog.bind('<Escape>', lambda event: new_term_dialog.destroy())
+        source_entry.bind('<KeyRelease>', update_warning)
+        target_entry.bind('<KeyRelease>', update_warning)
 
-        source_entry.insert(0, self.current_search_term)
+        if self.search_mode == SEARCH_MODES[0]:
+            source_entry.insert(0, self.current_search_term)
+        update_warning()
 
         new_term_dialog.transient(self.root)
         new_term_dialog.grab_set()
@@ -499,87 +1166,406 @@ class SimpleTermOnline:
         source_entry.focus()
 
 
-    def open_reviewer_mode(self, event=None):
-        # Create a new window for Reviewer Mode
-        reviewer_window = tk.Toplevel()
-        reviewer_window.title("Reviewer Mode")
+    @staticmethod
+    def describe_term_check(check):
+        """ One line on what a new entry would repeat or contradict, empty when it is new. """
+        if check.duplicates:
+            entry = check.duplicates[0]
+            return f"Already in the term base: {entry['source_term']} \u2192 {entry['target_term']}"
+        if check.conflicts:
+            entry = check.conflicts[0]
+            more = f" and {len(check.conflicts) - 1} more" if len(check.conflicts) > 1 else ""
+            return f"Conflicts with the reviewed entry {entry['source_term']} \u2192 {entry['target_term']}{more}"
+        if check.others:
+            count = len(check.others)
+            return f"This source term already has {count} {'entry' if count == 1 else 'entries'}."
+        return ""
+
+    def open_duplicate_report(self, event=None):
+        if not self.termbase.loaded:
+            messagebox.showwarning("Duplicates", "The Google Sheet is not loaded.")
+            return
 
-        # Create a frame to hold the canvas and scrollbar
-        frame = tk.Frame(reviewer_window)
-        frame.pack(fill=tk.BOTH, expand=True)
+        # The groups hold row IDs, so they are worked out again when the term base is reloaded
+        report = {'termbase': None, 'generation': None, 'groups': []}
+
+        report_window = tk.Toplevel(self.root)
+        report_window.title("Duplicates and Conflicts")
+
+        summary = tk.Label(report_window, anchor='w', justify=tk.LEFT)
+        summary.pack(fill=tk.X, padx=10, pady=(10, 0))
+
+        frame = tk.Frame(report_window)
+        frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        columns = ('row', 'source', 'target', 'reviewed')
+        tree = ttk.Treeview(frame, columns=columns, height=20, selectmode='browse')
+        tree.heading('#0', text='Problem')
+        tree.column('#0', width=110)
+        for column, title, width in zip(columns, ('Sheet Row', 'Source Term', 'Target Term', 'Reviewed'),
+                                        (120, 250, 250, 70)):
+            tree.heading(column, text=title)
+            tree.column(column, width=width, anchor=tk.CENTER if column == 'reviewed' else tk.W)
+        scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
-        # Create a canvas for scrollable content
-        canvas = tk.Canvas(frame)
-        canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        def sheet_row(row):
+            return report['termbase'].sheet_rows.get(row, 'new')
+
+        def row_values(row):
+            entry = report['termbase'].entry(row)
+            return (sheet_row(row), entry['source_term'], entry['target_term'],
+                    REVIEW_CHECKED if entry['reviewed'] else '')
+
+        def populate():
+            termbase = report['termbase'] = self.termbase
+            report['generation'] = termbase.generation
+            groups = report['groups'] = termbase.duplicate_report() if termbase.loaded else []
+            duplicates = [group for group in groups if group.kind == DUPLICATE]
+            extra = sum(len(group.rows) - 1 for group in duplicates)
+            summary.config(text=f"{len(duplicates)} duplicated entries ({extra} extra rows), "
+                                f"{len(groups) - len(duplicates)} source terms with conflicting targets. "
+                                "Double-click an entry to search it.")
+            tree.delete(*tree.get_children())
+            # Only the groups are listed up front; their entries are added when a group is opened
+            for number, group in enumerate(groups):
+                first = group.rows[0]
+                target = termbase.store.get(first, 'Target Term') if group.kind == DUPLICATE else \
+                    f"{len(group.rows)} targets"
+                rows = ', '.join(str(sheet_row(row)) for row in group.rows)
+                tree.insert('', tk.END, iid=f"group-{number}", text=group.kind.capitalize(),
+                            values=(rows, termbase.store.get(first, 'Source Term'), target, ''))
+                tree.insert(f"group-{number}", tk.END, iid=f"pending-{number}")
+
+        def up_to_date():
+            """ Whether the listed groups still match the term base; if not they are listed again. """
+            if report['termbase'] is self.termbase and report['generation'] == self.termbase.generation:
+                return True
+            populate()
+            return False
+
+        populate()
+
+        def on_open(event):
+            item = tree.focus()
+            if not up_to_date() or not item.startswith('group-') or not tree.exists(f"pending-{item[6:]}"):
+                return
+            tree.delete(f"pending-{item[6:]}")
+            for row in report['groups'][int(item[6:])].rows:
+                if row in report['termbase'].store:
+                    tree.insert(item, tk.END, iid=f"row-{row}-{item}", text='', values=row_values(row))
+
+        def on_double_click(event):
+            item = tree.focus()
+            if not up_to_date() or not item:
+                return
+            source = tree.set(item, 'source')
+            self.set_search_mode(SEARCH_MODES[0])
+            self.entry.delete(0, tk.END)
+            self.entry.insert(0, source)
+            self.search_term()
+
+        def save_report():
+            filename = filedialog.asksaveasfilename(
+                parent=report_window,
+                title="Save Report",
+                initialfile='duplicates.csv',
+                defaultextension='.csv',
+                filetypes=[("CSV files", "*.csv"), ("Excel workbooks", "*.xlsx")]
+            )
+            if not filename:
+                return
+            up_to_date()
+            termbase = report['termbase']
+
+            def report_rows():
+                yield ['Problem', 'Group', 'Sheet Row', 'Source Term', 'Target Term', 'Reviewed']
+                for number, group in enumerate(report['groups'], 1):
+                    for row in group.rows:
+                        if row in termbase.store:
+                            entry = termbase.entry(row)
+                            yield [group.kind, number, sheet_row(row), entry['source_term'], entry['target_term'],
+                                   'TRUE' if entry['reviewed'] else 'FALSE']
+            try:
+                export_rows(report_rows(), filename)
+            except Exception as e:
+                messagebox.showerror("Error", f"Error saving the report:\n{str(e)}", parent=report_window)
+                return
+            self.show_status(f"Duplicate report saved as {filename}.")
 
-        # Add a scrollbar
-        scrollbar = tk.Scrollbar(frame, orient=tk.VERTICAL, command=canvas.yview)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        tree.bind('<<TreeviewOpen>>', on_open)
+        tree.bind('<Double-1>', on_double_click)
 
-        # Create a frame to contain the content within the canvas
-        content_frame = tk.Frame(canvas)
-        
-        # Add content_frame to the canvas
-        canvas.create_window((0, 0), window=content_frame, anchor=tk.NW)
+        controls = tk.Frame(report_window)
+        controls.pack(fill=tk.X, padx=10, pady=(0, 10))
+        tk.Button(controls, text="Close", command=report_window.destroy).pack(side=tk.RIGHT)
+        tk.Button(controls, text="Save Report", command=save_report).pack(side=tk.RIGHT, padx=(0, 5))
 
-        # Configure scrollbar and canvas
-        content_frame.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
-        canvas.configure(yscrollcommand=scrollbar.set)
+        report_window.bind('<Escape>', lambda event: report_window.destroy())
 
-        # Bind mousewheel scrolling
-        def on_mousewheel(event):
-            # Scroll up or down
-            canvas.yview_scroll(int(-1*(event.delta/120)), "units")
+    @timed('ui.open_reviewer_mode')
+    def open_reviewer_mode(self, event=None):
+        if not self.termbase.loaded or 'Reviewed' not in self.termbase.column_numbers:
+            messagebox.showwarning("Reviewer Mode", "The Google Sheet is not loaded or has no 'Reviewed' column.")
+            return
 
-        canvas.bind_all("<MouseWheel>", on_mousewheel)  # Windows and macOS
+        # Create a new window for Reviewer Mode
+        reviewer_window = tk.Toplevel()
+        reviewer_window.title("Reviewer Mode")
 
-        # Filter out reviewed entries
-        self.check_vars = []
-        self.entries = []
+        # Only unreviewed rows are listed. Selection is one byte per row and only the
+        # current page of rows exists as tree items, so large backlogs stay cheap.
+        queue = self.termbase.review_queue()
+        self.review_entries = array('q', queue.rows)
+        self.review_selected = bytearray(len(self.review_entries))
+        # What the reviewer sees, to find the rows again after a reload and to detect teammates' edits
+        self.review_seen = (queue.sources, queue.targets, self.termbase.generation)
+        sources, targets, users = queue.sources, queue.targets, queue.users
+        source_keys, user_keys = queue.source_keys, queue.user_keys
+        state = {'visible': list(range(len(sources))), 'page': 0}
+
+        filter_frame = tk.Frame(reviewer_window)
+        filter_frame.pack(fill=tk.X, padx=10, pady=(10, 0))
+        tk.Label(filter_frame, text="Source starts with:").pack(side=tk.LEFT)
+        source_filter = tk.Entry(filter_frame, width=20, relief=tk.FLAT)
+        source_filter.pack(side=tk.LEFT, padx=(5, 15))
+        tk.Label(filter_frame, text="User:").pack(side=tk.LEFT)
+        user_filter = tk.Entry(filter_frame, width=15, relief=tk.FLAT)
+        user_filter.pack(side=tk.LEFT, padx=5)
 
-        # Get unreviewed entries
-        unreviewed_entries = self.df[self.df['Reviewed'] == False]
+        frame = tk.Frame(reviewer_window)
+        frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        tree = ttk.Treeview(frame, columns=('check', 'source', 'target', 'user'), show='headings',
+                            height=REVIEW_VISIBLE_ROWS, selectmode='browse')
+        tree.heading('check', text='')
+        tree.heading('source', text='Source Term')
+        tree.heading('target', text='Target Term')
+        tree.heading('user', text='User')
+        tree.column('check', width=30, stretch=False, anchor=tk.CENTER)
+        tree.column('source', width=250)
+        tree.column('target', width=250)
+        tree.column('user', width=100)
+        scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
-        for index, row in unreviewed_entries.iterrows():
-            var = tk.BooleanVar()
-            chk = tk.Checkbutton(content_frame, text=row['Source Term'] + ' - ' + row['Target Term'], variable=var)
-            chk.grid(row=index, column=0, sticky='w')
-            self.check_vars.append(var)
-            self.entries.append(index)  # Use row index for DataFrame
+        controls = tk.Frame(reviewer_window)
+        controls.pack(fill=tk.X, padx=10, pady=(0, 10))
+        page_label = tk.Label(controls, text='')
+
+        def page_count():
+            return max((len(state['visible']) + REVIEW_PAGE_SIZE - 1) // REVIEW_PAGE_SIZE, 1)
+
+        def update_page_label():
+            page_label.config(text=f"Page {state['page'] + 1} of {page_count()} - "
+                                   f"{len(state['visible'])} entries, {self.review_selected.count(1)} selected")
+
+        def render():
+            tree.delete(*tree.get_children())
+            start = state['page'] * REVIEW_PAGE_SIZE
+            for position in state['visible'][start:start + REVIEW_PAGE_SIZE]:
+                mark = REVIEW_CHECKED if self.review_selected[position] else REVIEW_UNCHECKED
+                tree.insert('', tk.END, iid=str(position), values=(mark, sources[position], targets[position], users[position]))
+            update_page_label()
+
+        def apply_filter(event=None):
+            source_prefix = normalize_term(source_filter.get())
+            user_prefix = normalize_term(user_filter.get())
+            state['visible'] = [position for position in range(len(sources))
+                                if source_keys[position].startswith(source_prefix)
+                                and user_keys[position].startswith(user_prefix)]
+            state['page'] = 0
+            render()
+
+        def change_page(step):
+            state['page'] = min(max(state['page'] + step, 0), page_count() - 1)
+            render()
+
+        def toggle(position):
+            self.review_selected[position] ^= 1
+            mark = REVIEW_CHECKED if self.review_selected[position] else REVIEW_UNCHECKED
+            tree.set(str(position), 'check', mark)
+            update_page_label()
+
+        def on_click(event):
+            item = tree.identify_row(event.y)
+            if item:
+                toggle(int(item))
+
+        def on_space(event):
+            item = tree.focus()
+            if item:
+                toggle(int(item))
+            return 'break'
+
+        def select_all(value):
+            for position in state['visible']:
+                self.review_selected[position] = value
+            render()
+
+        tk.Button(controls, text="Select All", command=lambda: select_all(1)).pack(side=tk.LEFT)
+        tk.Button(controls, text="Clear", command=lambda: select_all(0)).pack(side=tk.LEFT, padx=5)
+        tk.Button(controls, text="<", command=lambda: change_page(-1)).pack(side=tk.LEFT, padx=(15, 0))
+        page_label.pack(side=tk.LEFT, padx=5)
+        tk.Button(controls, text=">", command=lambda: change_page(1)).pack(side=tk.LEFT)
 
         # Button to confirm changes
-        confirm_button = tk.Button(reviewer_window, text="Update Selected", command=lambda: self.update_selected(reviewer_window))
-        confirm_button.pack(pady=10)
+        confirm_button = tk.Button(controls, text="Update Selected", command=lambda: self.update_selected(reviewer_window))
+        confirm_button.pack(side=tk.RIGHT)
+
+        source_filter.bind('<KeyRelease>', apply_filter)
+        user_filter.bind('<KeyRelease>', apply_filter)
+        tree.bind('<Button-1>', on_click)
+        tree.bind('<space>', on_space)
+        reviewer_window.bind('<Prior>', lambda event: change_page(-1))
+        reviewer_window.bind('<Next>', lambda event: change_page(1))
+        reviewer_window.bind('<Escape>', lambda event: reviewer_window.destroy())
+
+        render()
+        source_filter.focus_set()
 
     def update_selected(self, reviewer_window):
-        # Update the DataFrame and Google Sheet
-        for var, index in zip(self.check_vars, self.entries):
-            if var.get():  # If checkbox is checked
-                self.df.at[index, 'Reviewed'] = True
-                self.df.at[index, 'Reviewer'] = self.username
-                # Update Google Sheet
-                self.sheet.update_cell(index + 2, 5, 'TRUE')  # 5th column for 'Reviewed'
-                self.sheet.update_cell(index + 2, 6, self.username)  # 6th column for 'Reviewer'
+        # Update the local rows now and the Google Sheet in the background
+        selected = list(compress(range(len(self.review_entries)), self.review_selected))
+        sources, targets, generation = self.review_seen
+        username = self.username
+        skipped = 0
+        missing = 0
+        for position in selected:
+            seen = {'Source Term': sources[position], 'Target Term': targets[position]}
+            index = self.current_row(self.review_entries[position], generation, seen)
+            if index is None:
+                missing += 1
+                continue
+            try:
+                op = self.row_update_op(index, {'Reviewed': 'TRUE', 'Reviewer': username}, seen)
+            except ValueError:
+                skipped += 1
+                continue
+            self.queue_write(op)
+            self.termbase.apply_row_update(index, {'Reviewed': True, 'Reviewer': username})
+
+        if selected:
+            self.refresh_results()
+        if missing:
+            self.show_status(f"{missing} entries were changed or removed on the Google Sheet while the reviewer "
+                             "window was open and were not marked.", error=True)
+        elif skipped:
+            self.show_status(f"{skipped} new entries are not on the Google Sheet yet and were not marked. Press F5 and try again.", error=True)
 
         # Close the reviewer window
         reviewer_window.destroy()
-        
-    def resource_path(self, relative_path):
-        if hasattr(sys, '_MEIPASS'):
-            base_path = sys._MEIPASS
-        else:
-            base_path = os.path.dirname(__file__)
-        return os.path.join(base_path, relative_path)
 
+    def open_term_check(self, event=None):
+        if not self.termbase.loaded:
+            messagebox.showwarning("Term Check", "The Google Sheet is not loaded.")
+            return
+
+        check_window = tk.Toplevel(self.root)
+        check_window.title("Term Check")
+
+        text_frame = tk.Frame(check_window)
+        text_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 0))
+        tk.Label(text_frame, text="Source text:").grid(row=0, column=0, sticky='w')
+        tk.Label(text_frame, text="Translation (optional):").grid(row=0, column=1, sticky='w', padx=(10, 0))
+        source_text = tk.Text(text_frame, width=50, height=12, wrap=tk.WORD, relief=tk.FLAT)
+        source_text.grid(row=1, column=0, sticky='nsew')
+        target_text = tk.Text(text_frame, width=50, height=12, wrap=tk.WORD, relief=tk.FLAT)
+        target_text.grid(row=1, column=1, sticky='nsew', padx=(10, 0))
+        text_frame.grid_columnconfigure(0, weight=1)
+        text_frame.grid_columnconfigure(1, weight=1)
+        text_frame.grid_rowconfigure(1, weight=1)
+        source_text.tag_configure('term', background='#fff3b0')
+
+        frame = tk.Frame(check_window)
+        frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        tree = ttk.Treeview(frame, columns=('source', 'count', 'target', 'status'), show='headings',
+                            height=10, selectmode='browse')
+        tree.heading('source', text='Source Term')
+        tree.heading('count', text='Hits')
+        tree.heading('target', text='Target Term')
+        tree.heading('status', text='In Translation')
+        tree.column('source', width=250)
+        tree.column('count', width=50, stretch=False, anchor=tk.CENTER)
+        tree.column('target', width=250)
+        tree.column('status', width=100, stretch=False, anchor=tk.CENTER)
+        tree.tag_configure('missing', foreground='#b00020')
+        scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        controls = tk.Frame(check_window)
+        controls.pack(fill=tk.X, padx=10, pady=(0, 10))
+        summary_label = tk.Label(controls, text='')
+
+        def open_file(text_widget):
+            filename = filedialog.askopenfilename(parent=check_window, title="Open Text File",
+                                                  filetypes=[("Text files", "*.txt"), ("All files", "*.*")])
+            if not filename:
+                return
+            try:
+                with open(filename, 'r', encoding='utf-8-sig') as file:
+                    content = file.read()
+            except (OSError, UnicodeDecodeError) as e:
+                messagebox.showerror("Term Check", f"Could not read the file:\n{str(e)}", parent=check_window)
+                return
+            text_widget.delete('1.0', tk.END)
+            text_widget.insert('1.0', content)
+
+        def run_check(event=None):
+            source = source_text.get('1.0', 'end-1c')
+            translation = target_text.get('1.0', 'end-1c')
+            results = check_translation(self.termbase, source, translation if translation.strip() else None)
+
+            source_text.tag_remove('term', '1.0', tk.END)
+            tree.delete(*tree.get_children())
+            missing = 0
+            for result in results:
+                for hit in result.hits:
+                    source_text.tag_add('term', f'1.0 + {hit.start} chars', f'1.0 + {hit.end} chars')
+                targets = ' / '.join(str(entry['target_term']) for entry in result.entries)
+                if result.target_found is None:
+                    status, tags = '', ()
+                elif result.target_found:
+                    status, tags = 'Yes', ()
+                else:
+                    status, tags = 'Missing', ('missing',)
+                    missing += 1
+                tree.insert('', tk.END, values=(result.source_term, len(result.hits), targets, status), tags=tags)
+            summary = f"{len(results)} terms found"
+            if translation.strip():
+                summary += f", {missing} without their target term in the translation"
+            summary_label.config(text=summary)
+            return 'break'
+
+        def look_up(event=None):
+            item = tree.focus()
+            if item:
+                self.set_search_mode(SEARCH_MODES[0])
+                self.entry.delete(0, tk.END)
+                self.entry.insert(0, tree.set(item, 'source'))
+                self.search_term()
+
+        tk.Button(controls, text="Open Source...", command=lambda: open_file(source_text)).pack(side=tk.LEFT)
+        tk.Button(controls, text="Open Translation...", command=lambda: open_file(target_text)).pack(side=tk.LEFT, padx=5)
+        summary_label.pack(side=tk.LEFT, padx=10)
+        tk.Button(controls, text="Check", command=run_check).pack(side=tk.RIGHT)
+
+        tree.bind('<Double-1>', look_up)
+        tree.bind('<Return>', look_up)
+        check_window.bind('<Control-Return>', run_check)
+        check_window.bind('<Escape>', lambda event: check_window.destroy())
+
+        source_text.focus_set()
 
     def setup_icon(self):
         """ Set the application icon. """
-        icon_path = self.resource_path('app_icon.png')
-        try:
-            icon = PhotoImage(file=icon_path)
+        icon = self.assets.image('app_icon.png')
+        if icon is not None:
             self.root.iconphoto(True, icon)
-        except Exception as e:
-            print(f"Error loading icon: {e}")
 
 if __name__ == "__main__":
     root = tk.Tk()
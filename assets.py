@@ -0,0 +1,47 @@
+import os
+import sys
+from tkinter import PhotoImage
+
+
+def resource_path(relative_path):
+    """ Path of a bundled file, inside the PyInstaller archive when frozen. """
+    base_path = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base_path, relative_path)
+
+
+def icon_size(font_size):
+    """ Side in pixels of an icon shown next to text of the given point size. """
+    return max(font_size + 2, 8)
+
+
+class AssetCache:
+    """ Images from the bundled files, decoded and scaled once per size and kept for reuse.
+
+    Tk only shows an image while a Python reference to it exists, so the cache also keeps
+    every image it hands out alive. Files that fail to load are remembered as None, so a
+    missing asset is reported once instead of on every use.
+    """
+
+    def __init__(self, master=None):
+        self.master = master
+        self.images = {}
+
+    def image(self, name, size=None):
+        """ The image in name, scaled to size x size pixels when size is given; None if it cannot be loaded. """
+        key = (name, size)
+        if key not in self.images:
+            try:
+                self.images[key] = self.load(name, size)
+            except Exception as e:
+                print(f"Error loading {name}: {str(e)}")
+                self.images[key] = None
+        return self.images[key]
+
+    def load(self, name, size):
+        path = resource_path(name)
+        if size is None:
+            return PhotoImage(master=self.master, file=path)
+        # Tk can only scale by whole factors, so smooth scaling needs PIL
+        from PIL import Image, ImageTk
+        with Image.open(path) as image:
+            return ImageTk.PhotoImage(image.resize((size, size), Image.LANCZOS), master=self.master)
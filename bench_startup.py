@@ -0,0 +1,129 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from sheet_cache import SheetCache, CACHE_FILE
+
+DEFAULT_ROWS = 20000
+DEFAULT_RUNS = 5
+RUN_TIMEOUT = 120
+HEAVY_MODULES = ('pandas', 'gspread', 'oauth2client', 'PIL', 'pyperclip')
+# A closed local port: the app opens its sheet in the background and fails fast instead of reaching Google
+OFFLINE_SERVER = 'http://127.0.0.1:9'
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import SimpleTermOnline
+elapsed = time.perf_counter() - started
+print(json.dumps({'import': elapsed, 'heavy': [name for name in %r if name in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+WINDOW_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import tkinter as tk
+import SimpleTermOnline
+marks = {}
+root = tk.Tk()
+
+def on_map(event):
+    if event.widget is root:
+        marks.setdefault('window', time.perf_counter() - started)
+
+def check():
+    if 'window' in marks and app.termbase.loaded:
+        marks['searchable'] = time.perf_counter() - started
+        print(json.dumps(marks))
+        root.destroy()
+    else:
+        root.after(5, check)
+
+root.bind('<Map>', on_map)
+app = SimpleTermOnline.SimpleTermOnline(root)
+marks['constructed'] = time.perf_counter() - started
+root.after(0, check)
+root.after(%d, root.destroy)
+root.mainloop()
+""" % (RUN_TIMEOUT * 1000,)
+
+
+def make_workdir(rows):
+    """ A scratch directory with a config and a cached sheet of the given size, as after a first sync. """
+    workdir = tempfile.mkdtemp(prefix='simpleterm-bench-')
+    with open(os.path.join(workdir, 'config.json'), 'w') as file:
+        json.dump({'sheet_id': 'bench', 'json_keyfile_path': 'missing.json', 'username': 'bench',
+                   'server_url': OFFLINE_SERVER, 'poll_interval': 0}, file)
+    cache = SheetCache(os.path.join(workdir, CACHE_FILE))
+    header = ['Source Term', 'Target Term', 'Notes', 'User Info', 'Reviewed']
+    cache.save('bench', header, [[f"source term {i}", f"target term {i}", f"note {i}" if i % 3 else '',
+                                  'bench', 'TRUE' if i % 2 else 'FALSE'] for i in range(rows)], 'bench')
+    cache.close()
+    return workdir
+
+
+def run_script(script, workdir):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_DIR, os.environ.get('PYTHONPATH')])))
+    completed = subprocess.run([sys.executable, '-c', script], cwd=workdir, env=env,
+                               capture_output=True, text=True, timeout=RUN_TIMEOUT)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else
+                           f"exit status {completed.returncode}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples):
+    return {'median': statistics.median(samples), 'min': min(samples), 'max': max(samples)}
+
+
+def run(rows=DEFAULT_ROWS, runs=DEFAULT_RUNS, window=True):
+    """ Startup timings in seconds, each measured in a fresh interpreter so nothing is imported yet. """
+    workdir = make_workdir(rows)
+    imports = [run_script(IMPORT_SCRIPT, workdir) for _ in range(runs)]
+    report = {'rows': rows, 'runs': runs, 'python': sys.version.split()[0],
+              'import': summarize([sample['import'] for sample in imports]),
+              'heavy_modules_at_import': imports[-1]['heavy']}
+    if not window:
+        return report
+    try:
+        samples = [run_script(WINDOW_SCRIPT, workdir) for _ in range(runs)]
+    except (RuntimeError, subprocess.TimeoutExpired) as e:
+        # No display, e.g. on a build server
+        report['window_error'] = str(e)
+        return report
+    for name in ('constructed', 'window', 'searchable'):
+        report[name] = summarize([sample[name] for sample in samples])
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure how long SimpleTerm Online takes to start.")
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS, help="rows in the cached sheet")
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS, help="fresh starts to measure")
+    parser.add_argument('--no-window', action='store_true', help="only time the import, e.g. without a display")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = run(args.rows, max(args.runs, 1), not args.no_window)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{report['rows']} cached rows, median of {report['runs']} runs (min - max)")
+    labels = {'import': "Import", 'constructed': "Window built", 'window': "Window shown",
+              'searchable': "Terms searchable"}
+    for name, label in labels.items():
+        if name in report:
+            timing = report[name]
+            print(f"{label:18} {timing['median'] * 1000:8.1f} ms  ({timing['min'] * 1000:.1f} - {timing['max'] * 1000:.1f})")
+    print(f"Heavy modules loaded by the import: {', '.join(report['heavy_modules_at_import']) or 'none'}")
+    if 'window_error' in report:
+        print(f"Window not measured: {report['window_error']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from exporter import export_rows
+from fake_worksheet import FakeWorksheet, SYNTHETIC_HEADER, synthetic_rows
+from sheet_cache import SheetCache
+from termbase import TermBase, TEXT_COLUMNS
+from write_journal import WriteJournal
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_LOOKUPS = 2000
+DEFAULT_EDITS = 100
+EXPORT_FORMATS = ('csv', 'xlsx', 'tbx')
+CACHE_KEY = 'bench'
+
+
+def timed(func, *args):
+    """ (seconds, result) of one call. """
+    started = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - started, result
+
+
+def per_call(func, items):
+    """ Mean microseconds per call of func over items. """
+    started = time.perf_counter()
+    for item in items:
+        func(item)
+    return (time.perf_counter() - started) / max(len(items), 1) * 1e6
+
+
+def update_op(termbase, index, cells):
+    # Built like the app builds them: the expected values are the row as the sheet has it
+    row = termbase.store[index]
+    return {'op': 'update', 'row': termbase.sheet_rows[index], 'cells': cells,
+            'expected': {'Source Term': row['Source Term'], 'Target Term': row['Target Term']}}
+
+
+def bench_size(rows, workdir, latency=0, lookups=DEFAULT_LOOKUPS, edits=DEFAULT_EDITS, seed=0):
+    rng = random.Random(seed)
+    worksheet = FakeWorksheet(SYNTHETIC_HEADER, synthetic_rows(rows, seed), latency)
+    cache = SheetCache(os.path.join(workdir, f'cache-{rows}.sqlite3'))
+    result = {'rows': rows}
+
+    # Loading: first sync, the index build, a sync with nothing changed and a start from the cache
+    result['sync_cold'], synced = timed(cache.sync, CACHE_KEY, worksheet)
+    termbase = TermBase()
+    result['build_index'], _ = timed(termbase.set_sheet_data, synced.header, synced.rows)
+    result['sync_unchanged'], _ = timed(cache.sync, CACHE_KEY, worksheet)
+    result['load_from_cache'], _ = timed(TermBase.from_cache, cache, CACHE_KEY)
+    del synced
+
+    # Searching: half the lookups hit, half miss; suggestions are asked for while a term is typed
+    sources = termbase.store.column('Source Term')
+    hits = [rng.choice(sources) for _ in range(lookups // 2)]
+    misses = [f"missing term {number}" for number in range(lookups - len(hits))]
+    result['find_equivalent_us'] = per_call(termbase.find_equivalent, hits + misses)
+    prefixes = [term[:rng.randint(2, max(len(term), 2))] for term in hits[:max(lookups // 10, 1)]]
+    result['suggest_us'] = per_call(termbase.search_engine.suggest, prefixes)
+
+    # Reverse and notes search: the word indexes are built on the first search, then looked up
+    result['build_text_index'], _ = timed(lambda: [termbase.text_index(column) for column in TEXT_COLUMNS])
+    indexes = termbase.store.indexes()
+    targets = [termbase.store.get(index, 'Target Term') for index in rng.sample(indexes, min(lookups, len(indexes)))]
+    result['search_target_us'] = per_call(lambda text: termbase.search_text('Target Term', text), targets)
+    words = [rng.choice(note.split()) for note in termbase.store.column('Notes') if note.strip()][:lookups]
+    result['search_notes_us'] = per_call(lambda text: termbase.search_text('Notes', text), words)
+
+    # Duplicate checks run as a new term is typed; the report covers the whole sheet
+    result['build_duplicate_index'], _ = timed(termbase.duplicate_index)
+    pairs = [(termbase.store.get(index, 'Source Term'), termbase.store.get(index, 'Target Term'))
+             for index in rng.sample(indexes, min(lookups, len(indexes)))]
+    result['check_new_term_us'] = per_call(lambda pair: termbase.check_new_term(*pair), pairs)
+    result['duplicate_report'], groups = timed(termbase.duplicate_report)
+    result['duplicate_groups'] = len(groups)
+
+    # The reviewer window lists every unreviewed entry
+    result['review_queue'], queue = timed(termbase.review_queue)
+    result['unreviewed'] = len(queue.rows)
+
+    # Edits and reviews are applied locally and journaled, then sent to the sheet in one replay
+    journal = WriteJournal(os.path.join(workdir, f'journal-{rows}.jsonl'))
+    indexes = termbase.store.indexes()
+    edited = rng.sample(indexes, min(edits, len(indexes)))
+    reviewed = rng.sample(queue.rows, min(edits, len(queue.rows)))
+
+    def edit_locally():
+        for index in edited:
+            cells = {'Target Term': f"edited {index}", 'Notes': 'benchmark edit', termbase.user_column: 'bench'}
+            journal.append(update_op(termbase, index, cells))
+            termbase.apply_row_update(index, cells)
+        for index in reviewed:
+            journal.append(update_op(termbase, index, {'Reviewed': 'TRUE', 'Reviewer': 'bench'}))
+            termbase.apply_row_update(index, {'Reviewed': True, 'Reviewer': 'bench'})
+
+    result['edit_local'], _ = timed(edit_locally)
+    worksheet.calls.clear()
+    result['edit_commit'], report = timed(journal.replay, worksheet)
+    result['edits_saved'] = len(report.saved)
+    result['edit_commit_api_calls'] = dict(worksheet.calls)
+
+    for fmt in EXPORT_FORMATS:
+        path = os.path.join(workdir, f'export-{rows}.{fmt}')
+        result[f'export_{fmt}'], _ = timed(export_rows, termbase.iter_rows(), path)
+        os.remove(path)
+
+    cache.close()
+    return result
+
+
+def run(sizes=DEFAULT_SIZES, latency=0, lookups=DEFAULT_LOOKUPS, edits=DEFAULT_EDITS, seed=0, on_result=None):
+    """ A report with one result per size; times are seconds unless the name ends in _us. """
+    report = {'python': sys.version.split()[0], 'platform': platform.platform(), 'seed': seed,
+              'latency': latency, 'lookups': lookups, 'edits': edits, 'results': []}
+    workdir = tempfile.mkdtemp(prefix='simpleterm-bench-')
+    try:
+        for rows in sizes:
+            report['results'].append(bench_size(rows, workdir, latency, lookups, edits, seed))
+            if on_result is not None:
+                on_result(report['results'][-1])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def print_result(result):
+    print(f"{result['rows']} rows:")
+    for name, value in result.items():
+        if name == 'rows':
+            continue
+        if isinstance(value, dict):
+            value = ', '.join(f"{call} {count}" for call, count in sorted(value.items())) or 'none'
+        elif name.endswith('_us'):
+            value = f"{value:.1f} us"
+        elif isinstance(value, float):
+            value = f"{value * 1000:.1f} ms"
+        print(f"  {name:24} {value}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Time loading, searching, reviewing, saving and exporting against generated term bases.")
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help="comma-separated row counts, e.g. 1000,10000,100000,1000000")
+    parser.add_argument('--latency', type=float, default=0, help="seconds added to every fake sheet API call")
+    parser.add_argument('--lookups', type=int, default=DEFAULT_LOOKUPS, help="searches timed per size")
+    parser.add_argument('--edits', type=int, default=DEFAULT_EDITS, help="edits and reviews saved per size")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the generated term bases")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON instead of a table")
+    parser.add_argument('--output', help="also write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    report = run(sizes, args.latency, args.lookups, args.edits, args.seed,
+                 on_result=None if args.json else print_result)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
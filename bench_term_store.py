@@ -0,0 +1,180 @@
+import argparse
+import gc
+import itertools
+import json
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from term_store import TermStore
+
+DEFAULT_ROWS = 100000
+DEFAULT_OPS = 10000
+APPENDS = 200
+HEADER = ['Source Term', 'Target Term', 'Notes', 'User Info', 'Reviewed', 'Reviewer']
+USERS = ['anna', 'bert', 'chen', 'dana', 'emil']
+
+
+def sheet_rows(count, seed=0):
+    """ Rows as they come out of the cache: cell text decoded from JSON, so equal values are separate strings. """
+    rng = random.Random(seed)
+    rows = [[f"source term {i}", f"target term {i}", rng.choice(['', '', 'informal', 'legal', 'see style guide']),
+             rng.choice(USERS), rng.choice(['TRUE', 'FALSE']), rng.choice(USERS + [''])] for i in range(count)]
+    return json.loads(json.dumps(rows))
+
+
+class StoreBackend:
+    name = 'store'
+
+    def __init__(self, rows):
+        self.table = TermStore(HEADER, rows)
+
+    def lookup(self, index):
+        return self.table.get(index, 'Target Term'), self.table.get(index, 'Notes'), self.table.get(index, 'Reviewed')
+
+    def iterate(self, limit):
+        return sum(1 for index in range(limit) if self.table[index]['Target Term'])
+
+    def unreviewed(self):
+        return self.table.indexes(reviewed=False)
+
+    def update(self, index, value):
+        self.table.set(index, 'Target Term', value)
+
+    def append(self, values):
+        self.table.append(values)
+
+
+class DataFrameBackend:
+    """ The pandas DataFrame the term base used to be held in, as a baseline. """
+    name = 'dataframe'
+
+    def __init__(self, rows):
+        import pandas as pd
+        self.pd = pd
+        self.table = pd.DataFrame(rows, columns=HEADER)
+        self.table['Reviewed'] = self.table['Reviewed'].apply(lambda x: str(x).strip().lower() == 'true')
+
+    def lookup(self, index):
+        return (self.table.at[index, 'Target Term'], self.table.at[index, 'Notes'],
+                self.table.at[index, 'Reviewed'])
+
+    def iterate(self, limit):
+        return sum(1 for _, row in self.table.head(limit).iterrows() if row['Target Term'])
+
+    def unreviewed(self):
+        return self.table[~self.table['Reviewed'].astype(bool)].index.tolist()
+
+    def update(self, index, value):
+        self.table.at[index, 'Target Term'] = value
+
+    def append(self, values):
+        row = self.pd.DataFrame([values], index=[self.table.index.max() + 1])
+        self.table = self.pd.concat([self.table, row])
+
+
+BACKENDS = {backend.name: backend for backend in (StoreBackend, DataFrameBackend)}
+
+
+def measure(func, repeat=1):
+    """ Seconds per call, timed without tracing, and bytes allocated at peak by one more call. """
+    gc.collect()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    func()
+    peak = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return {'seconds': elapsed / repeat, 'peak_bytes': peak}
+
+
+def run_backend(name, rows, ops, seed=0):
+    backend_class = BACKENDS[name]
+    if name == 'dataframe':
+        import pandas  # so the import is not counted as memory held by the table
+    data = sheet_rows(rows, seed)
+    started = time.perf_counter()
+    backend = backend_class(data)
+    load_seconds = time.perf_counter() - started
+    del backend, data
+
+    # Memory is traced from before the rows are read, so the cell text the table keeps counts too
+    gc.collect()
+    tracemalloc.start()
+    data = sheet_rows(rows, seed)
+    backend = backend_class(data)
+    del data
+    gc.collect()
+    report = {'backend': name, 'rows': rows, 'load_seconds': load_seconds,
+              'table_bytes': tracemalloc.get_traced_memory()[0]}
+    tracemalloc.stop()
+
+    rng = random.Random(seed + 1)
+    indexes = [rng.randrange(rows) for _ in range(ops)]
+    positions = itertools.cycle(indexes)
+    report['lookup'] = measure(lambda: backend.lookup(next(positions)), ops)
+    report['iterate_1000_rows'] = measure(lambda: backend.iterate(1000), 5)
+    report['filter_unreviewed'] = measure(backend.unreviewed, 5)
+    positions = itertools.cycle(indexes)
+    report['update'] = measure(lambda: backend.update(next(positions), 'changed'), ops)
+    new_row = {'Source Term': 'new term', 'Target Term': 'new target', 'Notes': '', 'User Info': 'anna',
+               'Reviewed': False, 'Reviewer': ''}
+    report['append'] = measure(lambda: backend.append(new_row), APPENDS)
+    return report
+
+
+def resident_memory(name, rows, seed):
+    """ Resident memory in bytes of a fresh process holding rows in the backend, or None where
+    /proc is missing. Includes the modules the backend imports. """
+    script = ("import gc, os, bench_term_store as bench\n"
+              f"data = bench.sheet_rows({rows}, {seed})\n"
+              f"backend = bench.BACKENDS[{name!r}](data)\n"
+              "del data\n"
+              "gc.collect()\n"
+              "with open('/proc/self/statm') as file:\n"
+              "    print(int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE'))\n")
+    completed = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True)
+    return int(completed.stdout) if completed.returncode == 0 else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the term store with the pandas DataFrame it replaced.")
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS, help="rows in the generated sheet")
+    parser.add_argument('--ops', type=int, default=DEFAULT_OPS, help="lookups and updates to time")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the generated sheet")
+    parser.add_argument('--backend', choices=list(BACKENDS), action='append',
+                        help="backend to measure; both by default, the DataFrame only when pandas is installed")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    names = args.backend or list(BACKENDS)
+    reports = []
+    for name in names:
+        try:
+            report = run_backend(name, args.rows, args.ops, args.seed)
+        except ImportError as e:
+            print(f"Skipping {name}: {str(e)}", file=sys.stderr)
+            continue
+        report['resident_bytes'] = resident_memory(name, args.rows, args.seed)
+        reports.append(report)
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        return
+    for report in reports:
+        rss = report['resident_bytes']
+        print(f"{report['backend']}: {report['rows']} rows loaded in {report['load_seconds']:.2f}s, "
+              f"table {report['table_bytes'] / 2 ** 20:.1f} MiB"
+              + (f", process resident {rss / 2 ** 20:.1f} MiB" if rss else ""))
+        for name in ('lookup', 'iterate_1000_rows', 'filter_unreviewed', 'update', 'append'):
+            timing = report[name]
+            print(f"  {name:18} {timing['seconds'] * 1e6:12.1f} us/op  {timing['peak_bytes']:>12} bytes at peak")
+
+
+if __name__ == '__main__':
+    main()
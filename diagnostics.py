@@ -0,0 +1,207 @@
+import bisect
+import json
+import logging
+import threading
+import time
+from collections import deque
+from functools import wraps
+from logging.handlers import RotatingFileHandler
+
+from write_batch import error_status
+
+DIAGNOSTICS_LOG = 'diagnostics.log'
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUPS = 3
+# Upper bounds of the histogram buckets in milliseconds; the last bucket takes everything slower
+BUCKET_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+SLOW_OPERATION_SECONDS = 1.0
+# Google Sheets API limits per user and minute
+READ_QUOTA_PER_MINUTE = 60
+WRITE_QUOTA_PER_MINUTE = 60
+QUOTA_WINDOW_SECONDS = 60
+WRITE_CALLS = frozenset(['update_cell', 'update', 'append_row', 'batch_update', 'insert_row', 'delete_rows'])
+READ_CALLS = frozenset(['get', 'get_all_values', 'get_all_records', 'row_values', 'col_values', 'batch_get',
+                        'get_lastUpdateTime'])
+
+logger = logging.getLogger('simpleterm.diagnostics')
+
+
+class Histogram:
+    """ Call count, errors and a bucketed distribution of durations for one operation. """
+
+    __slots__ = ('count', 'errors', 'total', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+
+    def add(self, seconds, error=False):
+        self.count += 1
+        self.errors += error
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS_MS, seconds * 1000)] += 1
+
+    def percentile(self, fraction):
+        """ Upper bound in milliseconds of the bucket holding the given fraction of calls, capped at the max. """
+        wanted = fraction * self.count
+        seen = 0
+        for position, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= wanted:
+                bound = BUCKET_BOUNDS_MS[position] if position < len(BUCKET_BOUNDS_MS) else float('inf')
+                return min(bound, self.max * 1000)
+        return 0.0
+
+    def summary(self):
+        return {'count': self.count, 'errors': self.errors,
+                'mean_ms': self.total / self.count * 1000 if self.count else 0.0,
+                'p50_ms': self.percentile(0.5), 'p95_ms': self.percentile(0.95), 'max_ms': self.max * 1000}
+
+
+class Metrics:
+    """ Timings per operation and Sheets API usage, safe to record from any thread.
+
+    Recording costs a lock and a bisect, so it is fine for anything done per keystroke or per
+    request, though not per row. Operations slower than SLOW_OPERATION_SECONDS and failed API
+    calls are also written to the log as they happen.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.histograms = {}
+        self.api_calls = {'read': deque(), 'write': deque()}
+        self.rate_limited = 0
+
+    def record(self, name, seconds, error=False):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(seconds, error)
+        if seconds >= SLOW_OPERATION_SECONDS:
+            logger.info(json.dumps({'slow': name, 'ms': round(seconds * 1000, 1)}))
+
+    def timer(self, name):
+        return Timer(self, name)
+
+    def record_api_call(self, call, seconds, error=None):
+        kind = 'write' if call in WRITE_CALLS else 'read'
+        status = error_status(error) if error is not None else None
+        now = time.monotonic()
+        with self.lock:
+            window = self.api_calls[kind]
+            window.append(now)
+            while window and window[0] < now - QUOTA_WINDOW_SECONDS:
+                window.popleft()
+            self.rate_limited += status == 429
+        self.record(f"api.{call}", seconds, error is not None)
+        if error is not None:
+            logger.info(json.dumps({'api_error': call, 'status': status, 'error': str(error)[:200]}))
+
+    def quota(self):
+        """ API requests of the last minute as {'read': (used, limit), 'write': (used, limit)}. """
+        cutoff = time.monotonic() - QUOTA_WINDOW_SECONDS
+        with self.lock:
+            used = {kind: sum(1 for stamp in window if stamp >= cutoff) for kind, window in self.api_calls.items()}
+        return {'read': (used['read'], READ_QUOTA_PER_MINUTE), 'write': (used['write'], WRITE_QUOTA_PER_MINUTE)}
+
+    def snapshot(self):
+        with self.lock:
+            operations = {name: histogram.summary() for name, histogram in sorted(self.histograms.items())}
+            rate_limited = self.rate_limited
+        quota = self.quota()
+        return {'uptime_s': round(time.time() - self.started), 'operations': operations,
+                'api_last_minute': {kind: used for kind, (used, limit) in quota.items()},
+                'rate_limited': rate_limited}
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.histograms = {}
+            self.rate_limited = 0
+
+
+class Timer:
+    """ Context manager recording the time spent in its block, and whether it raised. """
+
+    __slots__ = ('metrics', 'name', 'started')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, error_type, error, traceback):
+        self.metrics.record(self.name, time.perf_counter() - self.started, error_type is not None)
+
+
+# One registry for the whole process, so any module can record into it
+metrics = Metrics()
+
+
+def timed(name):
+    """ Decorator recording every call of the function under name. """
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with metrics.timer(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class InstrumentedWorksheet:
+    """ Wraps a worksheet (gspread, a term server client or a fake) and records every API call.
+
+    Only the calls in READ_CALLS and WRITE_CALLS are wrapped; other attributes pass through
+    unchanged. The spreadsheet is wrapped as well, for the revision checks made through it.
+    """
+
+    def __init__(self, worksheet):
+        self.worksheet = worksheet
+        spreadsheet = getattr(worksheet, 'spreadsheet', None)
+        self.spreadsheet = InstrumentedWorksheet(spreadsheet) if spreadsheet is not None else None
+
+    def __getattr__(self, name):
+        attribute = getattr(self.worksheet, name)
+        if name not in READ_CALLS and name not in WRITE_CALLS or not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = attribute(*args, **kwargs)
+            except Exception as e:
+                metrics.record_api_call(name, time.perf_counter() - started, e)
+                raise
+            metrics.record_api_call(name, time.perf_counter() - started)
+            return result
+        return call
+
+
+def instrument(worksheet):
+    if worksheet is None or isinstance(worksheet, InstrumentedWorksheet):
+        return worksheet
+    return InstrumentedWorksheet(worksheet)
+
+
+def setup_log(path=DIAGNOSTICS_LOG, max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS):
+    """ Send diagnostics to a size-capped log file that keeps a few old copies. """
+    handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+    handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return handler
+
+
+def log_snapshot():
+    logger.info(json.dumps({'snapshot': metrics.snapshot()}))
@@ -0,0 +1,50 @@
+from collections import namedtuple
+
+from search_engine import normalize_term
+from text_index import text_tokens
+
+DUPLICATE = 'duplicate'
+CONFLICT = 'conflict'
+
+# Entries a new source/target pair would repeat, contradict when reviewed, or join as another target
+TermCheck = namedtuple('TermCheck', ['duplicates', 'conflicts', 'others'])
+# Row IDs of one problem found by the dedupe report, in sheet order
+DuplicateGroup = namedtuple('DuplicateGroup', ['kind', 'rows'])
+
+
+def duplicate_key(text):
+    """ Key under which two terms count as the same: folded words, ignoring spacing and punctuation. """
+    return ' '.join(text_tokens(text)) or normalize_term(text)
+
+
+class DuplicateIndex:
+    """ Row IDs grouped by the duplicate_key of their source term.
+
+    Almost every group holds one or two rows, so the target keys of a group are worked out
+    when it is checked instead of being stored; checking a pair costs a dict lookup and a
+    key per entry of that source. Blank source terms are not indexed.
+    """
+
+    def __init__(self):
+        self.sources = {}
+
+    def add(self, row, source_term):
+        key = duplicate_key(source_term)
+        if key:
+            self.sources.setdefault(key, []).append(row)
+
+    def remove(self, row, source_term):
+        key = duplicate_key(source_term)
+        rows = self.sources.get(key)
+        if rows is None or row not in rows:
+            return
+        rows.remove(row)
+        if not rows:
+            del self.sources[key]
+
+    def rows(self, source_term):
+        return self.sources.get(duplicate_key(source_term), [])
+
+    def groups(self):
+        """ Row ID lists of the source terms with more than one entry. """
+        return [rows for rows in self.sources.values() if len(rows) > 1]
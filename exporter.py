@@ -0,0 +1,194 @@
+import argparse
+import csv
+import datetime
+import os
+import re
+import sys
+import zipfile
+from xml.sax.saxutils import escape, quoteattr
+
+from sheet_cache import SheetCache, CACHE_FILE, BLOCK_ROWS, column_letter, iter_worksheet_rows
+from federation import cache_key
+from sheet_client import read_config, open_config_worksheet, missing_config
+
+EXPORT_FORMATS = ('csv', 'xlsx', 'tbx')
+PROGRESS_EVERY = 1000
+DEFAULT_SOURCE_LANG = 'und'
+DEFAULT_TARGET_LANG = 'und'
+
+# Characters XML 1.0 does not allow, which a spreadsheet cell can still contain
+INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>')
+XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>')
+XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Terms" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>')
+XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>')
+
+
+def xml_text(value):
+    return escape(INVALID_XML_CHARS.sub('', str(value)))
+
+
+def export_format(path):
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format '{extension}', use one of: {', '.join(EXPORT_FORMATS)}")
+    return extension
+
+
+def write_csv(path, rows, progress):
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        for count, row in enumerate(rows):
+            writer.writerow(row)
+            progress(count)
+
+
+def write_xlsx(path, rows, progress):
+    """ Minimal single-sheet workbook; the sheet XML is streamed into the zip row by row. """
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', XLSX_CONTENT_TYPES)
+        archive.writestr('_rels/.rels', XLSX_ROOT_RELS)
+        archive.writestr('xl/workbook.xml', XLSX_WORKBOOK)
+        archive.writestr('xl/_rels/workbook.xml.rels', XLSX_WORKBOOK_RELS)
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as file:
+            file.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                       b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+            letters = []
+            for count, row in enumerate(rows):
+                while len(letters) < len(row):
+                    letters.append(column_letter(len(letters) + 1))
+                number = count + 1
+                cells = ''.join(f'<c r="{letters[col]}{number}" t="inlineStr"><is><t xml:space="preserve">'
+                                f'{xml_text(value)}</t></is></c>'
+                                for col, value in enumerate(row) if value != '')
+                file.write(f'<row r="{number}">{cells}</row>'.encode('utf-8'))
+                progress(count)
+            file.write(b'</sheetData></worksheet>')
+
+
+def write_tbx(path, rows, progress, source_lang=DEFAULT_SOURCE_LANG, target_lang=DEFAULT_TARGET_LANG):
+    """ TBX (ISO 30042) termbase: one termEntry per row with a source and a target langSet. """
+    header = next(rows)
+    columns = {name: position for position, name in reversed(list(enumerate(header)))}
+
+    def cell(row, name):
+        position = columns.get(name)
+        return row[position] if position is not None and position < len(row) else ''
+
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                   f'<martif type="TBX" xml:lang={quoteattr(source_lang)}>\n'
+                   '<martifHeader><fileDesc><sourceDesc><p>SimpleTerm Online export</p></sourceDesc></fileDesc>'
+                   '</martifHeader>\n<text><body>\n')
+        progress(0)
+        for count, row in enumerate(rows, 1):
+            source = cell(row, 'Source Term')
+            target = cell(row, 'Target Term')
+            if not source and not target:
+                continue
+            parts = [f'<termEntry id="e{count}">']
+            if cell(row, 'Notes'):
+                parts.append(f'<note>{xml_text(cell(row, "Notes"))}</note>')
+            status = 'preferredTerm-admn-sts' if cell(row, 'Reviewed').strip().lower() == 'true' else 'admittedTerm-admn-sts'
+            parts.append(f'<langSet xml:lang={quoteattr(source_lang)}><tig><term>{xml_text(source)}</term></tig></langSet>')
+            parts.append(f'<langSet xml:lang={quoteattr(target_lang)}><tig><term>{xml_text(target)}</term>'
+                         f'<termNote type="administrativeStatus">{status}</termNote></tig></langSet>')
+            parts.append('</termEntry>\n')
+            file.write(''.join(parts))
+            progress(count)
+        file.write('</body></text>\n</martif>\n')
+
+
+def export_rows(rows, path, on_progress=None, **options):
+    """ Write an iterator of rows (header first) to path, in the format given by its extension.
+
+    Rows are consumed one at a time, so memory use does not grow with the size of the sheet.
+    on_progress is called with the number of data rows written every PROGRESS_EVERY rows.
+    Returns the number of data rows written.
+    """
+    writers = {'csv': write_csv, 'xlsx': write_xlsx, 'tbx': write_tbx}
+    fmt = export_format(path)
+    written = [0]
+
+    def progress(count):
+        written[0] = count
+        if on_progress is not None and count and count % PROGRESS_EVERY == 0:
+            on_progress(count)
+
+    writers[fmt](path, iter(rows), progress, **options)
+    return written[0]
+
+
+def default_filename(fmt='csv'):
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    return f'downloaded_sheet_{timestamp}.{fmt}'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the SimpleTerm Online term base to CSV, XLSX or TBX.")
+    parser.add_argument('output', nargs='?', help="output file; the extension picks the format")
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv',
+                        help="format used when no output file is given")
+    parser.add_argument('--source', choices=('sheet', 'cache'), default='sheet',
+                        help="read the Google Sheet in ranges, or the local cache without network access")
+    parser.add_argument('--config', default='config.json', help="path to config.json")
+    parser.add_argument('--cache-file', default=CACHE_FILE, help="path to the local sheet cache")
+    parser.add_argument('--block-rows', type=int, default=BLOCK_ROWS, help="rows per range read from the sheet")
+    parser.add_argument('--source-lang', help="TBX language code of source terms; source_lang in config.json by default")
+    parser.add_argument('--target-lang', help="TBX language code of target terms; target_lang in config.json by default")
+    args = parser.parse_args(argv)
+
+    config = read_config(args.config)
+    if args.source == 'cache':
+        missing = missing_config(config, 'sheet_id')
+    elif not config.get('server_url'):
+        # A term server reads the sheet for us and needs neither
+        missing = missing_config(config, 'sheet_id', 'json_keyfile_path')
+    else:
+        missing = []
+    if missing:
+        sys.exit(f"exporter: {args.config} has no {' or '.join(missing)}")
+    output = args.output or default_filename(args.format)
+    if args.source == 'cache':
+        rows = SheetCache(args.cache_file).iter_rows(cache_key(config.get('sheet_id'), config.get('worksheet')))
+    else:
+        rows = iter_worksheet_rows(open_config_worksheet(config), args.block_rows)
+
+    options = {}
+    if export_format(output) == 'tbx':
+        options = {'source_lang': args.source_lang or config.get('source_lang', DEFAULT_SOURCE_LANG),
+                   'target_lang': args.target_lang or config.get('target_lang', DEFAULT_TARGET_LANG)}
+    count = export_rows(rows, output, on_progress=lambda count: print(f"{count} rows written", file=sys.stderr),
+                        **options)
+    print(f"Exported {count} rows to {output}")
+
+
+if __name__ == '__main__':
+    main()
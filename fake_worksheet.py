@@ -0,0 +1,64 @@
+import random
+import time
+from collections import Counter
+
+from memory_sheet import MemorySheet
+
+SYNTHETIC_HEADER = ['Source Term', 'Target Term', 'Notes', 'User Info', 'Reviewed', 'Reviewer']
+SYNTHETIC_USERS = ['anna', 'bert', 'chen', 'dana', 'emil']
+SYNTHETIC_NOTES = ['informal', 'legal texts only', 'see style guide', 'plural only', 'UI string']
+SYNTHETIC_SYLLABLES = ['ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'ti', 'vo', 'an', 'el', 'or', 'us', 'ber', 'con',
+                       'dra', 'fel', 'gor', 'hin', 'jus', 'kel', 'lum', 'mor', 'nis', 'pra', 'quo', 'ris',
+                       'sten', 'tor', 'ul', 'ver', 'wal', 'xen', 'yor', 'zal', 'ing', 'tion', 'ment', 'ly']
+
+
+def synthetic_rows(count, seed=0):
+    """ Rows of a made-up term base: source terms of one to three made-up words, about one
+    in twenty with a second entry, plus notes, users and review marks in sheet text. """
+    rng = random.Random(seed)
+    rows = []
+    for number in range(count):
+        source = ' '.join(''.join(rng.choice(SYNTHETIC_SYLLABLES) for _ in range(rng.randint(2, 4)))
+                          for _ in range(rng.choice((1, 1, 2, 2, 3))))
+        for _ in range(2 if rng.random() < 0.05 else 1):
+            reviewed = rng.random() < 0.6
+            rows.append([source, f"target {number}-{len(rows)}",
+                         rng.choice(SYNTHETIC_NOTES) if rng.random() < 0.3 else '',
+                         rng.choice(SYNTHETIC_USERS), 'TRUE' if reviewed else 'FALSE',
+                         rng.choice(SYNTHETIC_USERS) if reviewed else ''])
+            if len(rows) == count:
+                return rows
+    return rows
+
+
+class FakeSpreadsheet:
+    def __init__(self, worksheet=None):
+        self.worksheet = worksheet
+        self.revision = 0
+
+    def get_lastUpdateTime(self):
+        if self.worksheet is not None:
+            self.worksheet._wait('get_lastUpdateTime')
+        return str(self.revision)
+
+
+class FakeWorksheet(MemorySheet):
+    """ In-memory stand-in for gspread.Worksheet covering the calls the app makes.
+
+    Every API call sleeps for latency seconds, to stand in for the network, and is counted
+    by name in calls; every change moves the spreadsheet's revision on.
+    """
+
+    def __init__(self, header, rows=None, latency=0):
+        super().__init__(header, rows)
+        self.spreadsheet = FakeSpreadsheet(self)
+        self.latency = latency
+        self.calls = Counter()
+
+    def _wait(self, call):
+        self.calls[call] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _touch(self):
+        self.spreadsheet.revision += 1
@@ -0,0 +1,90 @@
+from diagnostics import instrument
+from search_engine import MAX_SUGGESTIONS
+from sheet_client import open_worksheet, RemoteWorksheet
+from termbase import TermBase
+
+
+def cache_key(sheet_id, worksheet=None):
+    """ Key of a worksheet in the local cache; plain sheet IDs keep the key used for the first worksheet. """
+    return f"{sheet_id}/{worksheet}" if worksheet else sheet_id
+
+
+class SheetSource:
+    """ An extra glossary sheet from the 'sheets' list of config.json, searched next to the main sheet. """
+
+    def __init__(self, sheet_id, worksheet=None, label=None, server_url=None):
+        self.sheet_id = sheet_id
+        self.worksheet = worksheet or None
+        self.label = label or worksheet or sheet_id
+        self.server_url = server_url or None
+        self.key = cache_key(sheet_id, self.worksheet)
+        self.termbase = TermBase()
+        self.sheet = None
+
+    @classmethod
+    def from_config(cls, entry):
+        return cls(entry['sheet_id'], entry.get('worksheet'), entry.get('label'), entry.get('server_url'))
+
+    def to_config(self):
+        entry = {'sheet_id': self.sheet_id, 'label': self.label}
+        if self.worksheet:
+            entry['worksheet'] = self.worksheet
+        if self.server_url:
+            entry['server_url'] = self.server_url
+        return entry
+
+    def open(self, json_keyfile_path):
+        """ The worksheet, opened on first use; the calls below run off the Tk thread. """
+        if self.sheet is None and self.server_url:
+            self.sheet = instrument(RemoteWorksheet(self.server_url))
+        elif self.sheet is None:
+            self.sheet = instrument(open_worksheet(self.sheet_id, json_keyfile_path, self.worksheet))
+        return self.sheet
+
+    def sync(self, cache, json_keyfile_path):
+        return cache.sync(self.key, self.open(json_keyfile_path))
+
+    def poll(self, cache, json_keyfile_path, verify=False):
+        return cache.poll(self.key, self.open(json_keyfile_path), verify)
+
+
+class Federation:
+    """ The main term base and the extra glossary sheets, searched as one in priority order.
+
+    Results from the main sheet come first and are left as they are, so they can still be
+    edited and reviewed; results from the other sheets follow in the order the sheets are
+    configured and carry the sheet's label under 'sheet'.
+    """
+
+    def __init__(self, main, sources=None):
+        self.main = main
+        # Shared with the caller, so sheets added to or removed from the list are searched at once
+        self.sources = sources if sources is not None else []
+
+    def find_equivalent(self, term):
+        results = self.main.find_equivalent(term)
+        for source in self.sources:
+            if source.termbase.loaded:
+                results.extend(dict(entry, sheet=source.label) for entry in source.termbase.find_equivalent(term))
+        return results
+
+    def search_text(self, column, text):
+        """ Ranked word matches in column ('Target Term' or 'Notes'), the main sheet's first. """
+        results = self.main.search_text(column, text)
+        for source in self.sources:
+            if source.termbase.loaded:
+                results.extend(dict(entry, sheet=source.label) for entry in source.termbase.search_text(column, text))
+        return results
+
+    def suggest(self, text, limit=MAX_SUGGESTIONS):
+        """ Prefix completions from all sheets before any fuzzy match, each list in sheet priority order. """
+        engines = [self.main.search_engine] + [source.termbase.search_engine for source in self.sources]
+        suggestions = []
+        seen = set()
+        for lookup in ('complete', 'fuzzy'):
+            for engine in engines:
+                for key in getattr(engine, lookup)(text, limit):
+                    if len(suggestions) < limit and key not in seen:
+                        seen.add(key)
+                        suggestions.append(engine.labels[key])
+        return suggestions
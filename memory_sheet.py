@@ -0,0 +1,116 @@
+from sheet_cache import parse_a1, sheet_text
+
+
+class MemorySheet:
+    """ A sheet held in memory behind the gspread.Worksheet calls the app makes.
+
+    Values are read back as Sheets renders them, so a boolean appended as is comes back as
+    TRUE or FALSE. Subclasses hook into every call through _wait and into every change
+    through _touch.
+    """
+
+    def __init__(self, header, rows=None):
+        self.values = [list(header)] + [list(row) for row in (rows or [])]
+
+    def _wait(self, call):
+        pass
+
+    def _touch(self):
+        pass
+
+    def _cell(self, row, col):
+        if row <= len(self.values) and col <= len(self.values[row - 1]):
+            return self.values[row - 1][col - 1]
+        return ''
+
+    def _set(self, row, col, value):
+        while len(self.values) < row:
+            self.values.append([])
+        current = self.values[row - 1]
+        while len(current) < col:
+            current.append('')
+        current[col - 1] = value
+
+    def get_all_values(self):
+        self._wait('get_all_values')
+        width = max((len(row) for row in self.values), default=0)
+        return [[sheet_text(value) for value in row] + [''] * (width - len(row)) for row in self.values]
+
+    def get_all_records(self):
+        self._wait('get_all_records')
+        header = self.values[0]
+        return [dict(zip(header, row + [''] * (len(header) - len(row)))) for row in self.values[1:]]
+
+    def row_values(self, row):
+        self._wait('row_values')
+        if row > len(self.values):
+            return []
+        values = [sheet_text(value) for value in self.values[row - 1]]
+        while values and values[-1] == '':
+            values.pop()
+        return values
+
+    def col_values(self, col):
+        self._wait('col_values')
+        values = [sheet_text(self._cell(row, col)) for row in range(1, len(self.values) + 1)]
+        while values and values[-1] == '':
+            values.pop()
+        return values
+
+    def get(self, range_name):
+        self._wait('get')
+        return self._get(range_name)
+
+    def _get(self, range_name):
+        start, _, end = range_name.partition(':')
+        start_row, start_col = parse_a1(start)
+        end_row, end_col = parse_a1(end or start)
+        start_row = start_row or 1
+        start_col = start_col or 1
+        end_row = min(end_row or len(self.values), len(self.values))
+        end_col = end_col or max((len(row) for row in self.values), default=0)
+
+        block = []
+        for row in range(start_row, end_row + 1):
+            values = [sheet_text(self._cell(row, col)) for col in range(start_col, end_col + 1)]
+            while values and values[-1] == '':
+                values.pop()
+            block.append(values)
+        while block and not block[-1]:
+            block.pop()
+        return block
+
+    def batch_get(self, ranges, **kwargs):
+        self._wait('batch_get')
+        return [self._get(range_name) for range_name in ranges]
+
+    def update_cell(self, row, col, value):
+        self._wait('update_cell')
+        self._set(row, col, value)
+        self._touch()
+
+    def append_row(self, values, **kwargs):
+        self._wait('append_row')
+        self.values.append(list(values))
+        self._touch()
+        return {'updates': {'updatedRange': f"Sheet1!A{len(self.values)}:{len(self.values)}"}}
+
+    def batch_update(self, data, **kwargs):
+        self._wait('batch_update')
+        for update in data:
+            start = update['range'].partition(':')[0]
+            row, col = parse_a1(start)
+            for row_offset, values in enumerate(update['values']):
+                for col_offset, value in enumerate(values):
+                    self._set(row + row_offset, col + col_offset, value)
+        self._touch()
+
+    def insert_row(self, values, index=1):
+        self._wait('insert_row')
+        self.values.insert(index - 1, list(values))
+        self._touch()
+
+    def delete_rows(self, start_index, end_index=None):
+        self._wait('delete_rows')
+        del self.values[start_index - 1:(end_index or start_index)]
+        self._touch()
@@ -0,0 +1,171 @@
+import bisect
+import heapq
+import unicodedata
+from collections import Counter
+from itertools import chain
+
+NORMALIZE_NFKC = True
+MAX_SUGGESTIONS = 8
+GRAM_SIZE = 3
+# Fuzzy candidates verified with an edit distance per query, which keeps suggestions within the typing budget
+MAX_FUZZY_CANDIDATES = 64
+GRAM_PAD_START = '\x02' * (GRAM_SIZE - 1)
+GRAM_PAD_END = '\x03' * (GRAM_SIZE - 1)
+
+
+def normalize_term(term, nfkc=NORMALIZE_NFKC):
+    """ Fold a term into the key used by the term index. """
+    term = str(term).strip()
+    if nfkc:
+        term = unicodedata.normalize('NFKC', term)
+    return term.casefold()
+
+
+def term_grams(key):
+    padded = GRAM_PAD_START + key + GRAM_PAD_END
+    return {padded[i:i + GRAM_SIZE] for i in range(len(padded) - GRAM_SIZE + 1)}
+
+
+def bounded_distance(a, b, limit):
+    """ Levenshtein distance between a and b, or limit + 1 once it is known to exceed limit. """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        row_min = i
+        for j, char_b in enumerate(b, 1):
+            value = min(previous[j - 1] + (char_a != char_b), previous[j] + 1, current[j - 1] + 1)
+            current.append(value)
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class SearchEngine:
+    """ Prefix and typo-tolerant lookup over the distinct source terms of the sheet.
+
+    Prefix completions come from a sorted array of normalized keys searched with bisect.
+    Fuzzy matches come from a trigram index: a key within k edits of the query shares all
+    but at most GRAM_SIZE * k of its trigrams, so candidates only need to be collected from
+    the rarest few query trigrams before being verified with a bounded edit distance. The
+    postings are split by key length, since a key within k edits is at most k characters
+    longer or shorter, and only the MAX_FUZZY_CANDIDATES keys found in the most of those
+    postings are verified, so a short query over a large sheet stays within the typing
+    budget at the cost of missing a match that shares few trigrams with it.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.keys = []
+        self.labels = {}
+        self.counts = {}
+        self.key_ids = {}
+        self.id_keys = []
+        self.grams = {}
+
+    def build(self, terms):
+        self.clear()
+        for term in terms:
+            key = normalize_term(term)
+            if not key:
+                continue
+            if key in self.counts:
+                self.counts[key] += 1
+            else:
+                self.counts[key] = 1
+                self.labels[key] = str(term).strip()
+                self._index_grams(key)
+        self.keys = sorted(self.counts)
+
+    def add(self, term):
+        key = normalize_term(term)
+        if not key:
+            return
+        if key in self.counts:
+            self.counts[key] += 1
+            return
+        self.counts[key] = 1
+        self.labels[key] = str(term).strip()
+        bisect.insort(self.keys, key)
+        self._index_grams(key)
+
+    def remove(self, term):
+        key = normalize_term(term)
+        if key not in self.counts:
+            return
+        self.counts[key] -= 1
+        if self.counts[key] > 0:
+            return
+        del self.counts[key]
+        del self.labels[key]
+        position = bisect.bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            del self.keys[position]
+        # Postings keep the stale id; it is skipped at query time and dropped on the next build
+        key_id = self.key_ids.pop(key)
+        self.id_keys[key_id] = None
+
+    def _index_grams(self, key):
+        key_id = self.key_ids.get(key)
+        if key_id is None:
+            key_id = len(self.id_keys)
+            self.id_keys.append(key)
+            self.key_ids[key] = key_id
+        length = len(key)
+        for gram in term_grams(key):
+            self.grams.setdefault((gram, length), []).append(key_id)
+
+    def complete(self, text, limit=MAX_SUGGESTIONS):
+        prefix = normalize_term(text)
+        if not prefix:
+            return []
+        matches = []
+        position = bisect.bisect_left(self.keys, prefix)
+        while position < len(self.keys) and len(matches) < limit:
+            key = self.keys[position]
+            if not key.startswith(prefix):
+                break
+            matches.append(key)
+            position += 1
+        return matches
+
+    def fuzzy(self, text, limit=MAX_SUGGESTIONS, max_distance=None):
+        query = normalize_term(text)
+        if max_distance is None:
+            max_distance = 1 if len(query) <= 5 else 2
+        query_grams = term_grams(query)
+        threshold = len(query_grams) - GRAM_SIZE * max_distance
+        if threshold <= 0:
+            return []
+
+        lengths = range(max(len(query) - max_distance, 1), len(query) + max_distance + 1)
+        postings = sorted(([self.grams.get((gram, length), ()) for length in lengths] for gram in query_grams),
+                          key=lambda parts: sum(map(len, parts)))
+        hits = Counter()
+        for parts in postings[:len(postings) - threshold + 1]:
+            hits.update(chain.from_iterable(parts))
+
+        scored = []
+        for key_id in heapq.nlargest(MAX_FUZZY_CANDIDATES, hits, key=hits.__getitem__):
+            key = self.id_keys[key_id]
+            if key is None or key == query or len(term_grams(key) & query_grams) < threshold:
+                continue
+            distance = bounded_distance(query, key, max_distance)
+            if distance <= max_distance:
+                scored.append((distance, len(key), key))
+        scored.sort()
+        return [key for _, _, key in scored[:limit]]
+
+    def suggest(self, text, limit=MAX_SUGGESTIONS):
+        """ Prefix completions first, then fuzzy matches, as display labels. """
+        keys = self.complete(text, limit)
+        if len(keys) < limit:
+            seen = set(keys)
+            keys.extend(key for key in self.fuzzy(text, limit) if key not in seen)
+        return [self.labels[key] for key in keys[:limit]]
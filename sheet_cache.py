@@ -0,0 +1,290 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+from collections import namedtuple
+
+CACHE_FILE = 'sheet_cache.sqlite3'
+BLOCK_ROWS = 5000
+PROBE_ROWS = 20
+A1_PATTERN = re.compile(r'^([A-Z]+)?(\d+)?$')
+
+CachedSheet = namedtuple('CachedSheet', ['header', 'rows', 'revision'])
+SheetMeta = namedtuple('SheetMeta', ['header', 'revision', 'verified', 'length'])
+SyncResult = namedtuple('SyncResult', ['header', 'rows', 'changed', 'revision'])
+# rows maps 0-based positions of changed data rows to their values; length is the new row count.
+# full is set when a checksum pass over the whole sheet found the rows, which may have moved
+Delta = namedtuple('Delta', ['header', 'rows', 'length', 'revision', 'full'], defaults=(False,))
+
+
+def column_letter(number):
+    letters = ''
+    while number > 0:
+        number, remainder = divmod(number - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def parse_a1(label):
+    """ Split an A1 label like 'C12' into (row, column); missing parts come back as None. """
+    match = A1_PATTERN.match(label.strip().upper())
+    if match is None:
+        raise ValueError(f"Invalid A1 label: {label}")
+    letters, digits = match.groups()
+    column = None
+    if letters:
+        column = 0
+        for letter in letters:
+            column = column * 26 + ord(letter) - 64
+    return (int(digits) if digits else None), column
+
+
+def sheet_text(value):
+    """ A cell value as Google Sheets reads it back: booleans as TRUE/FALSE and None as an empty cell. """
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    return str(value)
+
+
+def row_checksum(row):
+    return hashlib.blake2b(json.dumps(row, ensure_ascii=False).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def fetch_revision(worksheet):
+    """ Last-modified marker of the spreadsheet, or None when the backend cannot report one. """
+    spreadsheet = getattr(worksheet, 'spreadsheet', None)
+    if spreadsheet is None:
+        return None
+    try:
+        if hasattr(spreadsheet, 'get_lastUpdateTime'):
+            return spreadsheet.get_lastUpdateTime()
+        return getattr(spreadsheet, 'lastUpdateTime', None)
+    except Exception:
+        return None
+
+
+class SheetCache:
+    """ On-disk copy of worksheets, keyed by sheet id, with a checksum per data row.
+
+    The cache lets the app open without touching the network. sync() compares the
+    spreadsheet revision with the cached one and skips the download entirely when nothing
+    changed; otherwise the sheet is read in BLOCK_ROWS ranges and only rows whose checksum
+    differs are rewritten and reported as changed. Several sheets may sync at once from
+    different threads; database access is serialized with a lock, network reads are not.
+
+    poll() is the cheap check for a sheet that is already cached. When the revision moved it
+    reads only the header, the last PROBE_ROWS rows and anything past them, which covers
+    rows added by teammates. Only when that shows nothing does it fall back to a full
+    checksum pass, since the change must then be further up. A probe that found rows records
+    the revision it saw, so the next poll reads nothing unless the sheet moved again, but not
+    as verified: rows above the tail may have changed in the same window, so poll(verify=True)
+    and sync() check an unverified revision in full. record_writes() lays the app's own saved
+    writes over the cached rows in the same way, so they are not read back either.
+    """
+
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS sheets (key TEXT PRIMARY KEY, header TEXT, revision TEXT)")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS rows (key TEXT, row INTEGER, checksum TEXT, data TEXT, "
+                "PRIMARY KEY (key, row))")
+            columns = [column[1] for column in self.connection.execute("PRAGMA table_info(sheets)")]
+            if 'verified' not in columns:
+                self.connection.execute("ALTER TABLE sheets ADD COLUMN verified TEXT")
+
+    def close(self):
+        self.connection.close()
+
+    def load(self, key):
+        with self.lock:
+            meta = self.connection.execute("SELECT header, revision FROM sheets WHERE key = ?", (key,)).fetchone()
+            if meta is None:
+                return None
+            rows = [json.loads(data) for (data,) in self.connection.execute(
+                "SELECT data FROM rows WHERE key = ? ORDER BY row", (key,))]
+        return CachedSheet(json.loads(meta[0]), rows, meta[1])
+
+    def meta(self, key):
+        with self.lock:
+            meta = self.connection.execute(
+                "SELECT header, revision, verified FROM sheets WHERE key = ?", (key,)).fetchone()
+            if meta is None:
+                return None
+            (length,) = self.connection.execute("SELECT COUNT(*) FROM rows WHERE key = ?", (key,)).fetchone()
+        return SheetMeta(json.loads(meta[0]), meta[1], meta[2], length)
+
+    def iter_rows(self, key):
+        """ Yield the cached header, then the cached rows one at a time. """
+        meta = self.connection.execute("SELECT header FROM sheets WHERE key = ?", (key,)).fetchone()
+        if meta is None:
+            raise KeyError(f"Sheet {key} is not in the local cache")
+        yield json.loads(meta[0])
+        for (data,) in self.connection.execute("SELECT data FROM rows WHERE key = ? ORDER BY row", (key,)):
+            yield json.loads(data)
+
+    def checksums(self, key, start=0):
+        with self.lock:
+            return [checksum for (checksum,) in self.connection.execute(
+                "SELECT checksum FROM rows WHERE key = ? AND row >= ? ORDER BY row", (key, start))]
+
+    def save(self, key, header, rows, revision=None, changed=None):
+        """ Store rows; with changed given, only those row positions are rewritten. """
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO sheets (key, header, revision, verified) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(header, ensure_ascii=False), revision, revision))
+            if changed is None:
+                self.connection.execute("DELETE FROM rows WHERE key = ?", (key,))
+                changed = range(len(rows))
+            else:
+                self.connection.execute("DELETE FROM rows WHERE key = ? AND row >= ?", (key, len(rows)))
+            self.save_rows(key, {position: rows[position] for position in changed})
+
+    def save_delta(self, key, delta):
+        """ Store the rows and length of a tail probe and its revision, which stays unverified. """
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM rows WHERE key = ? AND row >= ?", (key, delta.length))
+            self.save_rows(key, delta.rows)
+            if delta.revision is not None:
+                self.connection.execute("UPDATE sheets SET revision = ? WHERE key = ?", (delta.revision, key))
+
+    def save_rows(self, key, rows):
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO rows (key, row, checksum, data) VALUES (?, ?, ?, ?)",
+            ((key, position, row_checksum(row), json.dumps(row, ensure_ascii=False))
+             for position, row in rows.items()))
+
+    def record_writes(self, key, ops, revision=None):
+        """ Lay writes saved by this app, as WriteJournal ops with their sheet 'row', over the cached rows.
+
+        The revision read after the writes is recorded, unverified, when every op could be placed:
+        updates of cached rows, and adds right after the cached rows. Returns whether it was.
+        """
+        with self.lock, self.connection:
+            meta = self.meta(key)
+            if meta is None:
+                return False
+            columns = {name: number for number, name in reversed(list(enumerate(meta.header)))}
+            length = meta.length
+            rows = {}
+            complete = True
+            for op in ops:
+                position = (op.get('row') or 0) - 2
+                if op['op'] == 'add' and position == length:
+                    row, cells = [''] * len(meta.header), op['values']
+                    length += 1
+                elif op['op'] == 'update' and 0 <= position < length:
+                    row, cells = rows.get(position) or self.load_row(key, position), op['cells']
+                else:
+                    complete = False
+                    continue
+                for name, value in cells.items():
+                    if name in columns:
+                        row[columns[name]] = sheet_text(value)
+                rows[position] = row
+            self.save_rows(key, rows)
+            if not complete or revision is None:
+                return False
+            self.connection.execute("UPDATE sheets SET revision = ? WHERE key = ?", (revision, key))
+            return True
+
+    def load_row(self, key, position):
+        (data,) = self.connection.execute(
+            "SELECT data FROM rows WHERE key = ? AND row = ?", (key, position)).fetchone()
+        return json.loads(data)
+
+    def invalidate(self, key):
+        with self.lock, self.connection:
+            self.connection.execute("UPDATE sheets SET revision = NULL WHERE key = ?", (key,))
+
+    def sync(self, key, worksheet):
+        meta = self.meta(key)
+        revision = fetch_revision(worksheet)
+        if meta is not None and revision is not None and revision == meta.revision == meta.verified:
+            cached = self.load(key)
+            return SyncResult(cached.header, cached.rows, [], revision)
+
+        header, rows = self.read_worksheet(worksheet)
+        if meta is None or meta.header != header:
+            self.save(key, header, rows, revision)
+            return SyncResult(header, rows, list(range(len(rows))), revision)
+
+        old_checksums = self.checksums(key)
+        changed = [position for position, row in enumerate(rows)
+                   if position >= len(old_checksums) or old_checksums[position] != row_checksum(row)]
+        self.save(key, header, rows, revision, changed)
+        if len(rows) < len(old_checksums):
+            changed.extend(range(len(rows), len(old_checksums)))
+        return SyncResult(header, rows, changed, revision)
+
+    def poll(self, key, worksheet, verify=False, probe_rows=PROBE_ROWS):
+        """ Changes since the cached copy as a Delta, or None when nothing changed. """
+        meta = self.meta(key)
+        if meta is None:
+            return self.full_delta(key, worksheet)
+        revision = fetch_revision(worksheet)
+        if verify and (revision is None or revision != meta.verified):
+            return self.full_delta(key, worksheet)
+        if revision is not None and revision == meta.revision:
+            return None
+
+        width = len(meta.header)
+        start = max(2, meta.length + 2 - probe_rows)
+        header_block, tail = worksheet.batch_get(["1:1", f"A{start}:{column_letter(max(width, 1))}"])
+        header = [sheet_text(value) for value in header_block[0]] if header_block else []
+        if header != meta.header:
+            return self.full_delta(key, worksheet)
+        rows = [[sheet_text(value) for value in row] + [''] * (width - len(row)) for row in tail]
+        while rows and not any(rows[-1]):
+            rows.pop()
+        length = start - 2 + len(rows)
+        if length < meta.length:
+            # Rows were deleted, so everything after them moved up
+            return self.full_delta(key, worksheet)
+
+        checksums = self.checksums(key, start - 2)
+        changed = {start - 2 + offset: row for offset, row in enumerate(rows)
+                   if offset >= len(checksums) or checksums[offset] != row_checksum(row)}
+        if not changed:
+            return None if revision is None else self.full_delta(key, worksheet)
+        delta = Delta(header, changed, length, revision)
+        self.save_delta(key, delta)
+        return delta
+
+    def full_delta(self, key, worksheet):
+        result = self.sync(key, worksheet)
+        if not result.changed:
+            return None
+        return Delta(result.header, {position: result.rows[position] for position in result.changed
+                                     if position < len(result.rows)}, len(result.rows), result.revision, True)
+
+    def read_worksheet(self, worksheet, block_rows=BLOCK_ROWS):
+        rows = iter_worksheet_rows(worksheet, block_rows)
+        header = next(rows)
+        rows = list(rows)
+        while rows and not any(rows[-1]):
+            rows.pop()
+        return header, rows
+
+
+def iter_worksheet_rows(worksheet, block_rows=BLOCK_ROWS):
+    """ Yield the header, then data rows read in fixed-size ranges and padded to the header width. """
+    header = [sheet_text(value) for value in worksheet.row_values(1)]
+    yield header
+    width = len(header)
+    last_column = column_letter(max(width, 1))
+    start = 2
+    while True:
+        block = worksheet.get(f"A{start}:{last_column}{start + block_rows - 1}")
+        for row in block:
+            yield [sheet_text(value) for value in row] + [''] * (width - len(row))
+        if len(block) < block_rows:
+            return
+        start += block_rows
@@ -0,0 +1,105 @@
+import json
+import os
+import urllib.error
+import urllib.parse
+import urllib.request
+
+CONFIG_FILE = 'config.json'
+REMOTE_TIMEOUT = 30
+SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+
+
+def read_config(path=CONFIG_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as file:
+        return json.load(file)
+
+
+def missing_config(config, *names):
+    """ The settings among names that a config.json leaves out or empty. """
+    return [name for name in names if not config.get(name)]
+
+
+def open_worksheet(sheet_id, json_keyfile_path, worksheet=None):
+    """ Authorize with the service-account key file and return the named worksheet, or the first one. """
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
+
+    creds = ServiceAccountCredentials.from_json_keyfile_name(json_keyfile_path, SCOPE)
+    client = gspread.authorize(creds)
+    spreadsheet = client.open_by_key(sheet_id)
+    return spreadsheet.worksheet(worksheet) if worksheet else spreadsheet.sheet1
+
+
+def open_config_worksheet(config):
+    """ The main worksheet named by a config.json: through its term server if it has one, else from Google Sheets. """
+    if config.get('server_url'):
+        return RemoteWorksheet(config['server_url'], token=config.get('server_token'))
+    return open_worksheet(config['sheet_id'], config['json_keyfile_path'], config.get('worksheet'))
+
+
+class RemoteError(Exception):
+    """ Error answer from a term server; code is the HTTP status, as on a gspread APIError. """
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+class RemoteSpreadsheet:
+    def __init__(self, worksheet):
+        self.worksheet = worksheet
+
+    def get_lastUpdateTime(self):
+        return self.worksheet.request('GET', '/revision')['revision']
+
+
+class RemoteWorksheet:
+    """ A sheet served by term_server.py, with the gspread.Worksheet calls the app makes.
+
+    Reads come from the server's in-memory copy; writes are passed on to Google Sheets by
+    the server, which answers with the status Google gave, so retries and the write
+    journal behave as they do against Google directly.
+    """
+
+    def __init__(self, server_url, timeout=REMOTE_TIMEOUT, token=None):
+        self.server_url = server_url.rstrip('/')
+        self.timeout = timeout
+        self.token = token or None
+        self.spreadsheet = RemoteSpreadsheet(self)
+
+    def request(self, method, path, payload=None, **query):
+        url = self.server_url + path
+        if query:
+            url += '?' + urllib.parse.urlencode(query)
+        data = None if payload is None else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f"Bearer {self.token}"
+        request = urllib.request.Request(url, data=data, method=method, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read().decode('utf-8')).get('error', e.reason)
+            except ValueError:
+                message = e.reason
+            raise RemoteError(e.code, message) from None
+
+    def row_values(self, row):
+        values = self.get(f"A{row}:{row}")
+        return values[0] if values else []
+
+    def get(self, range_name):
+        return self.request('GET', '/values', range=range_name)['values']
+
+    def batch_get(self, ranges, **kwargs):
+        return self.request('POST', '/batch_get', {'ranges': list(ranges)})['value_ranges']
+
+    def append_row(self, values, **kwargs):
+        return self.request('POST', '/append_row', {'values': list(values)})
+
+    def batch_update(self, data, **kwargs):
+        return self.request('POST', '/batch_update', {'data': data})
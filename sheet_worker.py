@@ -0,0 +1,103 @@
+import queue
+import threading
+import time
+
+from diagnostics import metrics
+
+POLL_INTERVAL_MS = 50
+READER_THREADS = 4
+
+
+class SheetWorker:
+    """ Runs Google Sheets calls on one background thread and delivers results on the Tk thread.
+
+    Jobs run in submission order, so a write queued after another write never overtakes it.
+    Jobs submitted with parallel=True skip that queue and run on a small pool of reader
+    threads instead, for independent reads such as loading several sheets at once. Jobs
+    submitted with quiet=True, such as background polls, are not reported to on_status.
+    Callbacks are invoked from root.after, never from the worker thread, so they may touch
+    widgets and app state freely.
+    """
+
+    def __init__(self, root, on_status=None, poll_interval=POLL_INTERVAL_MS, readers=READER_THREADS):
+        self.root = root
+        self.on_status = on_status
+        self.poll_interval = poll_interval
+        self.requests = queue.Queue()
+        self.parallel_requests = queue.Queue()
+        self.results = queue.Queue()
+        self.pending = []
+        self.thread = threading.Thread(target=self._run, args=(self.requests,), name='SheetWorker', daemon=True)
+        self.thread.start()
+        self.readers = [threading.Thread(target=self._run, args=(self.parallel_requests,),
+                                         name=f'SheetReader-{number}', daemon=True)
+                        for number in range(1, readers + 1)]
+        for reader in self.readers:
+            reader.start()
+        self.next_poll = time.perf_counter() + self.poll_interval / 1000
+        self.root.after(self.poll_interval, self._poll)
+
+    def submit(self, description, func, *args, on_success=None, on_error=None, parallel=False, quiet=False):
+        job = (description, func, args, on_success, on_error, quiet)
+        (self.parallel_requests if parallel else self.requests).put(job)
+        if not quiet:
+            self.pending.append(description)
+            self._report()
+        return job
+
+    def call_soon(self, func, *args):
+        """ Run func on the Tk thread; safe to call from inside a job, e.g. to report progress. """
+        self.results.put((None, True, (func, args)))
+
+    def stop(self):
+        self.requests.put(None)
+        for reader in self.readers:
+            self.parallel_requests.put(None)
+
+    def _run(self, requests):
+        while True:
+            job = requests.get()
+            if job is None:
+                return
+            description, func, args, on_success, on_error, quiet = job
+            started = time.perf_counter()
+            try:
+                result = (job, True, func(*args))
+            except Exception as e:
+                result = (job, False, e)
+            metrics.record(f"job.{description}", time.perf_counter() - started, not result[1])
+            self.results.put(result)
+
+    def _poll(self):
+        # How late this call is shows how long the Tk thread was busy with something else
+        metrics.record('tk.event_loop_lag', max(time.perf_counter() - self.next_poll, 0))
+        try:
+            while True:
+                job, succeeded, value = self.results.get_nowait()
+                if job is None:
+                    func, args = value
+                    func(*args)
+                    continue
+                description, _, _, on_success, on_error, quiet = job
+                if not quiet:
+                    self.pending.remove(description)
+                try:
+                    if succeeded and on_success is not None:
+                        on_success(value)
+                    elif not succeeded:
+                        if on_error is not None:
+                            on_error(value)
+                        else:
+                            print(f"{description} failed: {str(value)}")
+                except Exception as e:
+                    print(f"Error handling result of {description}: {str(e)}")
+                if not quiet:
+                    self._report()
+        except queue.Empty:
+            pass
+        self.next_poll = time.perf_counter() + self.poll_interval / 1000
+        self.root.after(self.poll_interval, self._poll)
+
+    def _report(self):
+        if self.on_status is not None:
+            self.on_status(list(self.pending))
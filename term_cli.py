@@ -0,0 +1,137 @@
+import argparse
+import json
+import sys
+import time
+from functools import partial
+from multiprocessing import Pool
+
+from federation import cache_key
+from sheet_cache import SheetCache, CACHE_FILE
+from sheet_client import read_config, missing_config
+from termbase import TermBase
+
+BATCH_SIZE = 500
+OUTPUT_FORMATS = ('jsonl', 'tsv')
+
+# Each worker process loads its own copy of the term base once, in init_worker
+worker_termbase = None
+
+
+def load_termbase(cache_file, key):
+    cache = SheetCache(cache_file)
+    try:
+        return TermBase.from_cache(cache, key)
+    finally:
+        cache.close()
+
+
+def init_worker(cache_file, key):
+    global worker_termbase
+    worker_termbase = load_termbase(cache_file, key)
+
+
+def parse_line(line):
+    """ A lookup record from one input line: a JSON object with a 'term' key, or the plain term. """
+    line = line.rstrip('\r\n')
+    if line.lstrip().startswith('{'):
+        record = json.loads(line)
+        if 'term' not in record:
+            raise ValueError("JSON input lines need a 'term' key")
+        return record
+    return {'term': line}
+
+
+def lookup(termbase, record, fuzzy=False):
+    term = str(record['term'])
+    result = dict(record)
+    result['matches'] = [{'target_term': entry['target_term'], 'notes': entry['notes'],
+                          'reviewed': entry['reviewed']} for entry in termbase.find_equivalent(term)]
+    if fuzzy and not result['matches'] and term.strip():
+        result['suggestions'] = termbase.search_engine.suggest(term)
+    return result
+
+
+def lookup_batch(records, fuzzy=False):
+    return [lookup(worker_termbase, record, fuzzy) for record in records]
+
+
+def iter_batches(lines, size):
+    batch = []
+    for line in lines:
+        if not line.strip():
+            continue
+        batch.append(parse_line(line))
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def format_result(result, fmt):
+    if fmt == 'jsonl':
+        return json.dumps(result, ensure_ascii=False)
+    # One line per match so the output can be fed to cut, sort or a spreadsheet
+    clean = lambda value: str(value).replace('\t', ' ').replace('\n', ' ')
+    if not result['matches']:
+        return '\t'.join([clean(result['term']), '', '', ''])
+    return '\n'.join('\t'.join([clean(result['term']), clean(match['target_term']), clean(match['notes']),
+                                'TRUE' if match['reviewed'] else 'FALSE'])
+                     for match in result['matches'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Look up terms in the SimpleTerm Online term base without opening the window.")
+    parser.add_argument('input', nargs='?', help="file with one term or JSON object per line; stdin by default")
+    parser.add_argument('--config', default='config.json', help="path to config.json")
+    parser.add_argument('--cache-file', default=CACHE_FILE, help="path to the local sheet cache")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='jsonl', help="output format")
+    parser.add_argument('--jobs', type=int, default=1, help="worker processes used to look up batches")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="terms sent to a worker at a time")
+    parser.add_argument('--fuzzy', action='store_true', help="suggest close source terms when nothing matches")
+    args = parser.parse_args(argv)
+
+    config = read_config(args.config)
+    if missing_config(config, 'sheet_id'):
+        sys.exit(f"term_cli: {args.config} has no sheet_id")
+    key = cache_key(config['sheet_id'], config.get('worksheet'))
+    started = time.perf_counter()
+    try:
+        termbase = load_termbase(args.cache_file, key)
+    except KeyError as e:
+        sys.exit(f"term_cli: {e.args[0]}; open it in SimpleTerm Online once to fill the cache")
+    loaded = time.perf_counter()
+    print(f"Loaded {len(termbase)} entries in {loaded - started:.2f}s", file=sys.stderr)
+
+    source = open(args.input, 'r', encoding='utf-8') if args.input else sys.stdin
+    batches = iter_batches(source, max(args.batch_size, 1))
+    terms = 0
+    found = 0
+    pool = None
+    try:
+        if args.jobs > 1:
+            pool = Pool(args.jobs, initializer=init_worker, initargs=(args.cache_file, key))
+            results = pool.imap(partial(lookup_batch, fuzzy=args.fuzzy), batches)
+        else:
+            results = ([lookup(termbase, record, args.fuzzy) for record in batch] for batch in batches)
+        # imap keeps input order, so output lines follow the input even with several workers
+        for batch in results:
+            sys.stdout.write(''.join(format_result(result, args.format) + '\n' for result in batch))
+            sys.stdout.flush()
+            terms += len(batch)
+            found += sum(1 for result in batch if result['matches'])
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        if source is not sys.stdin:
+            source.close()
+
+    elapsed = time.perf_counter() - loaded
+    rate = terms / elapsed if elapsed > 0 else 0
+    print(f"Looked up {terms} terms ({found} with matches) in {elapsed:.2f}s, {rate:.0f} terms/s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
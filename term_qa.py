@@ -0,0 +1,113 @@
+import re
+from collections import namedtuple
+
+from search_engine import normalize_term
+
+# Scripts written without spaces are matched one character at a time, everything else by word
+UNSPACED_CHARS = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+TOKEN_PATTERN = re.compile(rf'[{UNSPACED_CHARS}]|(?:(?![{UNSPACED_CHARS}])\w)+|[^\w\s]')
+TERMINAL = None
+
+TermHit = namedtuple('TermHit', ['start', 'end', 'text', 'key'])
+QAResult = namedtuple('QAResult', ['key', 'source_term', 'hits', 'entries', 'target_found'])
+
+
+def tokenize(text):
+    """ Yield (start, end, folded token) for the words and symbols of text. """
+    folded = {}
+    for match in TOKEN_PATTERN.finditer(text):
+        token = match.group()
+        if token not in folded:
+            folded[token] = normalize_term(token)
+        yield match.start(), match.end(), folded[token]
+
+
+class TermMatcher:
+    """ Finds every occurrence of a set of terms in a text in one pass.
+
+    Terms are stored in a trie keyed by folded tokens, so matches always start and end on
+    word boundaries, ignore case and treat any run of whitespace between words alike. The
+    text is tokenized once and the trie is walked from each token, which costs at most the
+    length of the longest term in tokens per token of text.
+    """
+
+    def __init__(self, terms=()):
+        self.root = {}
+        self.max_tokens = 0
+        for term in terms:
+            self.add(term)
+
+    def add(self, term, key=None):
+        tokens = [token for _, _, token in tokenize(str(term))]
+        if not tokens:
+            return
+        node = self.root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node[TERMINAL] = normalize_term(term) if key is None else key
+        self.max_tokens = max(self.max_tokens, len(tokens))
+
+    def remove(self, term):
+        node = self.root
+        for _, _, token in tokenize(str(term)):
+            node = node.get(token)
+            if node is None:
+                return
+        node.pop(TERMINAL, None)
+
+    def find(self, text, longest=True):
+        """ Term occurrences in text as TermHits, in text order.
+
+        With longest, overlapping occurrences give way to the longest one starting first, so
+        'machine translation' is reported without the 'translation' inside it.
+        """
+        tokens = list(tokenize(text))
+        hits = []
+        last_end = 0
+        for position in range(len(tokens)):
+            if longest and tokens[position][0] < last_end:
+                continue
+            node = self.root
+            found = []
+            for start, end, token in tokens[position:position + self.max_tokens]:
+                node = node.get(token)
+                if node is None:
+                    break
+                if TERMINAL in node:
+                    found.append((end, node[TERMINAL]))
+            if not found:
+                continue
+            start = tokens[position][0]
+            if longest:
+                end, key = found[-1]
+                hits.append(TermHit(start, end, text[start:end], key))
+                last_end = end
+            else:
+                hits.extend(TermHit(start, end, text[start:end], key) for end, key in found)
+        return hits
+
+
+def check_translation(termbase, source_text, target_text=None, matcher=None):
+    """ QAResults for every term of termbase found in source_text, in order of first occurrence.
+
+    When target_text is given, target_found tells whether any approved target term of the
+    entry appears in it; otherwise it is None.
+    """
+    if matcher is None:
+        matcher = termbase.term_matcher()
+    grouped = {}
+    for hit in matcher.find(source_text):
+        grouped.setdefault(hit.key, []).append(hit)
+
+    results = []
+    for key, hits in grouped.items():
+        entries = termbase.find_equivalent(key)
+        results.append(QAResult(key, termbase.search_engine.labels.get(key, hits[0].text), hits, entries, None))
+    if target_text is None:
+        return results
+
+    target_matcher = TermMatcher(str(entry['target_term']) for result in results for entry in result.entries)
+    present = {hit.key for hit in target_matcher.find(target_text, longest=False)}
+    return [result._replace(target_found=any(normalize_term(entry['target_term']) in present
+                                             for entry in result.entries))
+            for result in results]
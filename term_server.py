@@ -0,0 +1,380 @@
+import argparse
+import asyncio
+import hmac
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qsl
+
+from fake_worksheet import FakeWorksheet
+from federation import cache_key
+from memory_sheet import MemorySheet
+from sheet_cache import SheetCache, CACHE_FILE, fetch_revision, parse_a1, sheet_text
+from sheet_client import read_config, open_worksheet, missing_config
+from term_cli import lookup
+from termbase import TermBase
+from write_batch import WriteBatch, call_with_backoff, error_status, RATE_LIMIT_STATUS_CODES
+from write_journal import parse_updated_row
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+SYNC_INTERVAL = 60
+FULL_CHECK_SYNCS = 10
+MAX_BODY_BYTES = 16 * 1024 * 1024
+FAKE_HEADER = ['Source Term', 'Target Term', 'Notes', 'User Info', 'Reviewed', 'Reviewer']
+TOKEN_ENV = 'TERM_SERVER_TOKEN'
+# Endpoints that change the sheet; with a token set they need 'Authorization: Bearer <token>'
+WRITE_ROUTES = {('POST', '/append_row'), ('POST', '/batch_update'), ('POST', '/add'), ('POST', '/edit')}
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class TermServer:
+    """ Keeps one sheet and its term base in memory and answers lookups and writes over HTTP/JSON.
+
+    Desktop clients point a RemoteWorksheet at the server and read ranges from this copy
+    instead of Google Sheets, so only the server talks to the sheet and syncs it on a
+    schedule. Writes go to the sheet first and are applied to the copy once the sheet has
+    accepted them. Sheet calls run on one thread, so they reach the sheet in the order the
+    requests arrived; lookups are answered from memory without waiting for them. A write
+    holds write_lock from its conflict check until the copy has it, so two edits of one row
+    cannot both pass the check.
+
+    With a token, the WRITE_ROUTES refuse requests that do not carry it; reads stay open.
+    Conflicts are checked against the copy, which sees changes made directly in Google
+    Sheets only at the next sync, so an edit can overwrite such a change made up to
+    sync_interval seconds before it.
+    """
+
+    def __init__(self, worksheet, key, cache, sync_interval=SYNC_INTERVAL, token=None):
+        self.worksheet = worksheet
+        self.token = token or None
+        self.key = key
+        self.cache = cache
+        self.sync_interval = sync_interval
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='TermServer')
+        self.mirror = MemorySheet([])
+        self.write_lock = asyncio.Lock()
+        self.termbase = TermBase()
+        self.revision = None
+        self.generation = 0
+        self.sync_count = 0
+        self.stale = False
+        self.sync_task = None
+        self.routes = {
+            ('GET', '/info'): self.info,
+            ('GET', '/revision'): self.get_revision,
+            ('GET', '/values'): self.values,
+            ('POST', '/batch_get'): self.batch_get,
+            ('POST', '/append_row'): self.append_row,
+            ('POST', '/batch_update'): self.batch_update,
+            ('GET', '/lookup'): self.lookup,
+            ('GET', '/suggest'): self.suggest,
+            ('POST', '/add'): self.add,
+            ('POST', '/edit'): self.edit,
+        }
+
+    @property
+    def header(self):
+        return self.mirror.values[0] if self.mirror.values else []
+
+    def log(self, text):
+        print(f"{time.strftime('%H:%M:%S')} {text}", file=sys.stderr)
+
+    def require(self, values, name):
+        if name not in values:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Missing '{name}'")
+        return values[name]
+
+    async def run(self, func, *args, **kwargs):
+        """ Run a sheet call on the server's sheet thread. """
+        return await asyncio.get_running_loop().run_in_executor(self.executor, partial(func, *args, **kwargs))
+
+    def load(self, header, rows):
+        self.mirror = MemorySheet(header, rows)
+        self.termbase.set_sheet_data(header, rows)
+        self.bump()
+
+    def bump(self):
+        # Unique across restarts, so a client never mistakes a new copy for the one it cached
+        self.revision = str(time.time_ns())
+
+    async def start(self):
+        cached = self.cache.load(self.key)
+        if cached is not None:
+            self.load(cached.header, cached.rows)
+            self.log(f"Loaded {len(cached.rows)} rows from the local cache")
+        await self.sync()
+        self.sync_task = asyncio.create_task(self.sync_forever())
+
+    async def sync_forever(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            await self.sync()
+
+    async def sync(self):
+        generation = self.generation
+        self.sync_count += 1
+        verify = self.sync_count % FULL_CHECK_SYNCS == 0
+        try:
+            delta = await self.run(self.cache.poll, self.key, self.worksheet, verify)
+        except Exception as e:
+            self.log(f"Error syncing Google Sheet: {str(e)}")
+            return
+        if delta is not None and generation != self.generation and self.revision is not None:
+            # A write that finished meanwhile may be missing from this read; reload on the next sync
+            self.stale = True
+            return
+        if self.stale or self.revision is None or (delta is not None and not self.merge(delta)):
+            cached = self.cache.load(self.key)
+            self.load(cached.header, cached.rows)
+            self.stale = False
+            self.log(f"Loaded {len(cached.rows)} rows")
+        elif delta is not None:
+            self.log(f"Merged {len(delta.rows)} changed rows")
+
+    def merge(self, delta):
+        # Rows found by a full checksum pass may have moved, so only a reload is safe then
+        if delta.full or not self.termbase.merge_rows(delta.header, delta.rows, delta.length):
+            return False
+        values = self.mirror.values
+        del values[delta.length + 1:]
+        for position, row in delta.rows.items():
+            while len(values) < position + 2:
+                values.append([])
+            values[position + 1] = list(row)
+        self.bump()
+        return True
+
+    async def write(self, func, *args, **kwargs):
+        try:
+            return await self.run(call_with_backoff, func, *args, **kwargs)
+        except Exception as e:
+            # Connection problems become 503 so clients keep the write and try again later
+            raise RequestError(error_status(e) or HTTPStatus.SERVICE_UNAVAILABLE, f"Google Sheets: {str(e)}")
+        finally:
+            self.generation += 1
+
+    def info(self, query, payload):
+        return {'key': self.key, 'revision': self.revision, 'header': self.header, 'entries': len(self.termbase)}
+
+    def get_revision(self, query, payload):
+        return {'revision': self.revision}
+
+    def values(self, query, payload):
+        return {'values': self.mirror.get(self.require(query, 'range'))}
+
+    def batch_get(self, query, payload):
+        return {'value_ranges': self.mirror.batch_get(self.require(payload, 'ranges'))}
+
+    def lookup(self, query, payload):
+        record = {'term': self.require(query, 'term')}
+        return lookup(self.termbase, record, fuzzy=query.get('fuzzy') in ('1', 'true'))
+
+    def suggest(self, query, payload):
+        return {'suggestions': self.termbase.search_engine.suggest(self.require(query, 'text'))}
+
+    async def append(self, values):
+        values = list(values)
+        async with self.write_lock:
+            try:
+                response = await self.write(self.worksheet.append_row, values, retry_on=RATE_LIMIT_STATUS_CODES)
+            except RequestError:
+                # The row may have been added all the same, so read the sheet again before answering:
+                # a client checks the copy for the row before it sends the add a second time
+                await self.sync()
+                raise
+            row = parse_updated_row(response) or len(self.mirror.values) + 1
+            self.apply_add(row, values)
+            await self.run(self.record_writes, [{'op': 'add', 'row': row, 'values': dict(zip(self.header, values))}])
+        return row
+
+    async def append_row(self, query, payload):
+        row = await self.append(self.require(payload, 'values'))
+        return {'updates': {'updatedRange': f"Sheet1!A{row}:{row}"}}
+
+    async def batch_update(self, query, payload):
+        data = self.require(payload, 'data')
+        async with self.write_lock:
+            await self.write(self.worksheet.batch_update, data, value_input_option='USER_ENTERED')
+            await self.run(self.record_writes, self.apply_updates(data))
+        return {}
+
+    async def add(self, query, payload):
+        values = self.require(payload, 'values')
+        return {'row': await self.append([values.get(name, '') for name in self.header])}
+
+    async def edit(self, query, payload):
+        row = int(self.require(payload, 'row'))
+        cells = self.require(payload, 'cells')
+        columns = {name: number for number, name in reversed(list(enumerate(self.header, 1)))}
+        missing = [name for name in list(cells) + list(payload.get('expected', {})) if name not in columns]
+        if missing:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Column(s) {', '.join(missing)} not found in the sheet")
+        batch = WriteBatch()
+        for name, value in cells.items():
+            batch.set_cell(row, columns[name], value)
+        data = batch.ranges()
+
+        async with self.write_lock:
+            current = self.mirror.row_values(row) if 1 < row <= len(self.mirror.values) else None
+            for name, value in payload.get('expected', {}).items():
+                cell = current[columns[name] - 1] if current and columns[name] <= len(current) else ''
+                if current is None or cell != sheet_text(value):
+                    raise RequestError(HTTPStatus.CONFLICT, f"Row {row} was changed by someone else")
+            await self.write(self.worksheet.batch_update, data, value_input_option='USER_ENTERED')
+            await self.run(self.record_writes, self.apply_updates(data))
+        return {'row': row}
+
+    def record_writes(self, ops):
+        """ Put the server's own writes into the cache, so the next sync does not read them back. """
+        self.cache.record_writes(self.key, ops, fetch_revision(self.worksheet))
+
+    def apply_add(self, row, values):
+        self.mirror.batch_update([{'range': f"A{row}", 'values': [values]}])
+        cells = {name: sheet_text(value) for name, value in zip(self.header, values)}
+        index = self.termbase.append_row(self.termbase.parse_cells(cells))
+        self.termbase.set_sheet_row(index, row)
+        self.bump()
+
+    def apply_updates(self, data):
+        """ Apply a batch_update to the copy and return it as WriteJournal update ops. """
+        self.mirror.batch_update(data)
+        changes = {}
+        for update in data:
+            row, col = parse_a1(update['range'].partition(':')[0])
+            for row_offset, values in enumerate(update['values']):
+                for col_offset, value in enumerate(values):
+                    if col + col_offset <= len(self.header):
+                        changes.setdefault(row + row_offset, {})[self.header[col + col_offset - 1]] = value
+        if any(row not in self.termbase.row_ids for row in changes):
+            # Cells outside the known rows, rebuild the term base from the copy instead
+            values = self.mirror.get_all_values()
+            self.termbase.set_sheet_data(values[0], values[1:])
+        else:
+            for row, cells in changes.items():
+                cells = {name: sheet_text(value) for name, value in cells.items()}
+                self.termbase.apply_row_update(self.termbase.row_ids[row], self.termbase.parse_cells(cells))
+        self.bump()
+        return [{'op': 'update', 'row': row, 'cells': cells} for row, cells in changes.items()]
+
+    def authorize(self, headers):
+        scheme, _, token = headers.get('authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not hmac.compare_digest(token.strip().encode(), self.token.encode()):
+            raise RequestError(HTTPStatus.UNAUTHORIZED, "Missing or wrong server token")
+
+    async def dispatch(self, method, target, body, headers=None):
+        url = urlsplit(target)
+        handler = self.routes.get((method, url.path))
+        if handler is None:
+            raise RequestError(HTTPStatus.NOT_FOUND, f"No such endpoint: {method} {url.path}")
+        if self.token and (method, url.path) in WRITE_ROUTES:
+            self.authorize(headers or {})
+        try:
+            payload = json.loads(body) if body else {}
+        except ValueError:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "The request body is not valid JSON")
+        result = handler(dict(parse_qsl(url.query)), payload)
+        if asyncio.iscoroutine(result):
+            result = await result
+        return result
+
+    async def handle(self, reader, writer):
+        status = HTTPStatus.OK
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            if len(request_line) != 3:
+                raise RequestError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+            method, target, _ = request_line
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get('content-length') or 0)
+            if length > MAX_BODY_BYTES:
+                raise RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+            body = await reader.readexactly(length) if length else b''
+            response = await self.dispatch(method, target, body, headers)
+        except RequestError as e:
+            status, response = HTTPStatus(e.status), {'error': str(e)}
+        except Exception as e:
+            self.log(f"Error handling request: {str(e)}")
+            status, response = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)}
+
+        data = json.dumps(response, ensure_ascii=False).encode('utf-8')
+        writer.write(f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                     "Content-Type: application/json; charset=utf-8\r\n"
+                     f"Content-Length: {len(data)}\r\n"
+                     "Connection: close\r\n\r\n".encode('latin-1') + data)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, on_ready=None):
+        await self.start()
+        server = await asyncio.start_server(self.handle, host, port)
+        address = server.sockets[0].getsockname()
+        self.log(f"Serving {len(self.termbase)} entries on http://{address[0]}:{address[1]}")
+        if self.token is None and host not in ('127.0.0.1', 'localhost', '::1'):
+            self.log(f"Warning: anyone who can reach this address can change the sheet; set {TOKEN_ENV}")
+        if on_ready is not None:
+            on_ready(address)
+        async with server:
+            await server.serve_forever()
+
+
+def fake_worksheet(rows):
+    """ Synthetic in-memory sheet for trying the server and its clients without Google Sheets. """
+    return FakeWorksheet(FAKE_HEADER, [[f'term {number}', f'target {number}', '', 'server', 'FALSE', '']
+                                       for number in range(rows)])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Serve the SimpleTerm Online term base to several desktop clients from one warm copy.")
+    parser.add_argument('--config', default='config.json', help="path to config.json")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="address to listen on")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="port to listen on")
+    parser.add_argument('--sync-interval', type=float, default=SYNC_INTERVAL,
+                        help="seconds between syncs with the Google Sheet")
+    parser.add_argument('--cache-file', default=CACHE_FILE, help="path to the local sheet cache")
+    parser.add_argument('--token', default=os.environ.get(TOKEN_ENV),
+                        help=f"shared token required for writes; ${TOKEN_ENV} or server_token in config.json by default")
+    parser.add_argument('--fake-rows', type=int, default=None,
+                        help="serve a synthetic in-memory sheet with this many rows instead of Google Sheets")
+    args = parser.parse_args(argv)
+
+    config = read_config(args.config)
+    missing = missing_config(config, 'sheet_id', 'json_keyfile_path')
+    if args.fake_rows is not None:
+        worksheet = fake_worksheet(args.fake_rows)
+        key = 'fake'
+        cache = SheetCache(':memory:')
+    elif missing:
+        sys.exit(f"term_server: {args.config} has no {' or '.join(missing)}")
+    else:
+        worksheet = open_worksheet(config['sheet_id'], config['json_keyfile_path'], config.get('worksheet'))
+        key = cache_key(config['sheet_id'], config.get('worksheet'))
+        cache = SheetCache(args.cache_file)
+
+    try:
+        server = TermServer(worksheet, key, cache, args.sync_interval, args.token or config.get('server_token'))
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+from itertools import compress
+
+REVIEWED_COLUMN = 'Reviewed'
+# Per-row flag bits
+ALIVE = 1
+REVIEWED = 2
+# Columns with more distinct values than this share of rows are not worth an intern table
+INTERN_RATIO = 0.5
+
+
+class TermRecord:
+    """ A view of one row of a TermStore, read by column name; nothing is copied until a value is read. """
+
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    def __getitem__(self, column):
+        return self.store.get(self.index, column)
+
+    def get(self, column, default=None):
+        return self.store.get(self.index, column) if column in self.store.positions else default
+
+    def keys(self):
+        return list(self.store.positions)
+
+    def as_dict(self):
+        return {column: self.store.get(self.index, column) for column in self.store.positions}
+
+
+class TermStore:
+    """ The rows of a sheet held column by column, for the row lookups, cell edits and
+    'Reviewed' filters the term base needs.
+
+    Each column is a list of strings that share one object per distinct value, so repeated
+    user names, reviewer names and notes are stored once. 'Reviewed' is kept as a bit in
+    the per-row flags bytearray rather than as a column. Row IDs are list positions and are
+    never reused: a removed row is only marked as gone, so the IDs of the other rows stay put.
+    """
+
+    def __init__(self, header=(), rows=()):
+        self.header = list(header)
+        self.positions = {}
+        for position, name in enumerate(self.header):
+            self.positions.setdefault(name, position)
+        self.reviewed_position = self.positions.get(REVIEWED_COLUMN)
+        self.columns = [[] for _ in self.header]
+        self.interned = [{} for _ in self.header]
+        self.flags = bytearray()
+        self.count = 0
+        self.extend(rows)
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, index):
+        return 0 <= index < len(self.flags) and bool(self.flags[index] & ALIVE)
+
+    def __getitem__(self, index):
+        if index not in self:
+            raise KeyError(index)
+        return TermRecord(self, index)
+
+    def _intern(self, position, value):
+        value = '' if value is None else str(value)
+        table = self.interned[position]
+        return value if table is None else table.setdefault(value, value)
+
+    def extend(self, rows):
+        """ Append sheet rows given as lists of cell text in header order; 'Reviewed' is parsed as on the sheet. """
+        width = len(self.header)
+        rows = [row if len(row) == width else list(row[:width]) + [''] * (width - len(row)) for row in rows]
+        if not rows:
+            return
+        marks = bytes([ALIVE]) * len(rows)
+        for position, values in enumerate(zip(*rows)):
+            if position == self.reviewed_position:
+                marks = bytes(ALIVE | REVIEWED if str(value).strip().lower() == 'true' else ALIVE for value in values)
+                continue
+            table = self.interned[position]
+            if table is None:
+                column = ['' if value is None else str(value) for value in values]
+            else:
+                column = [table.setdefault(value, value) if isinstance(value, str) else self._intern(position, value)
+                          for value in values]
+                # A column of mostly unique values, like the terms, would only pay for the table
+                if len(table) > (len(self.columns[position]) + len(column)) * INTERN_RATIO:
+                    self.interned[position] = None
+            self.columns[position].extend(column)
+        self.flags.extend(marks)
+        self.count += len(rows)
+
+    def get(self, index, column):
+        position = self.positions[column]
+        if position == self.reviewed_position:
+            return bool(self.flags[index] & REVIEWED)
+        return self.columns[position][index]
+
+    def set(self, index, column, value):
+        """ Change one cell; columns the sheet does not have are ignored. """
+        position = self.positions.get(column)
+        if position is None:
+            return
+        if position == self.reviewed_position:
+            if value:
+                self.flags[index] |= REVIEWED
+            else:
+                self.flags[index] &= ~REVIEWED
+        else:
+            self.columns[position][index] = self._intern(position, value)
+
+    def update(self, index, changes):
+        for column, value in changes.items():
+            self.set(index, column, value)
+
+    def append(self, values):
+        """ Add a row from values keyed by column name and return its row ID. """
+        index = len(self.flags)
+        for position, column in enumerate(self.columns):
+            if position != self.reviewed_position:
+                column.append(self._intern(position, values.get(self.header[position], '')))
+        self.flags.append(ALIVE | REVIEWED if values.get(REVIEWED_COLUMN) else ALIVE)
+        self.count += 1
+        return index
+
+    def remove(self, index):
+        if index not in self:
+            raise KeyError(index)
+        self.flags[index] = 0
+        for position, column in enumerate(self.columns):
+            if position != self.reviewed_position:
+                column[index] = ''
+        self.count -= 1
+
+    def indexes(self, reviewed=None):
+        """ Row IDs in sheet order, optionally only those with the given 'Reviewed' state. """
+        if reviewed is None:
+            wanted = (ALIVE, ALIVE | REVIEWED)
+        else:
+            wanted = (ALIVE | REVIEWED,) if reviewed else (ALIVE,)
+        mask = self.flags.translate(bytes(1 if flag in wanted else 0 for flag in range(256)))
+        return list(compress(range(len(self.flags)), mask))
+
+    def column(self, name, indexes=None):
+        """ The values of one column, for all rows or the given row IDs. """
+        if indexes is None:
+            indexes = self.indexes()
+        position = self.positions[name]
+        if position == self.reviewed_position:
+            return [bool(self.flags[index] & REVIEWED) for index in indexes]
+        values = self.columns[position]
+        return [values[index] for index in indexes]
+
+    def iter_rows(self):
+        """ Yield every row as sheet text in header order, with 'Reviewed' as TRUE or FALSE. """
+        columns = [None if position == self.reviewed_position else column
+                   for position, column in enumerate(self.columns)]
+        for index in self.indexes():
+            yield [('TRUE' if self.flags[index] & REVIEWED else 'FALSE') if column is None else column[index]
+                   for column in columns]
@@ -0,0 +1,342 @@
+from collections import namedtuple
+from itertools import count
+
+from diagnostics import timed
+from duplicates import CONFLICT, DUPLICATE, DuplicateGroup, DuplicateIndex, TermCheck, duplicate_key
+from search_engine import SearchEngine, normalize_term
+from term_qa import TermMatcher
+from term_store import TermStore
+from text_index import MAX_TEXT_RESULTS, TextIndex
+
+# Header names accepted for the column holding who added or last edited an entry
+USER_COLUMNS = ('User Info', 'Username')
+
+# Tells each load of a term base apart, across TermBase objects too
+GENERATIONS = count(1)
+
+# Columns with a word index for reverse and full-text search
+TEXT_COLUMNS = ('Target Term', 'Notes')
+
+# Entries waiting for review, as parallel lists in sheet order, with folded keys for filtering
+ReviewQueue = namedtuple('ReviewQueue', ['rows', 'sources', 'targets', 'users', 'source_keys', 'user_keys'])
+
+
+class TermBase:
+    """ The term base as loaded from a sheet, with its lookup indexes; no Tk or network code.
+
+    store holds the rows and hands out the row IDs. sheet_rows maps row IDs to sheet rows and
+    row_ids the reverse; column_numbers maps header names to 1-based sheet columns. Rows added
+    locally and not yet on the sheet have no sheet row. term_index maps folded source terms to
+    the row IDs holding them, in sheet order. generation changes with every set_sheet_data,
+    which hands out new row IDs, so code that kept row IDs across a reload can tell and look
+    its rows up again with find_row; edits counts the row changes since. text_indexes holds a
+    word index for each of the TEXT_COLUMNS once it has been searched or built in the
+    background with build_text_indexes, and duplicates groups rows by loosely folded source
+    term once a new term has been checked or the dedupe report asked for.
+    """
+
+    def __init__(self):
+        self.store = None
+        self.generation = 0
+        self.edits = 0
+        self.header = []
+        self.column_numbers = {}
+        self.sheet_rows = {}
+        self.row_ids = {}
+        self.user_column = USER_COLUMNS[0]
+        self.term_index = {}
+        self.search_engine = SearchEngine()
+        self.matcher = None
+        self.text_indexes = {}
+        self.duplicates = None
+        self.pending_adds = {}
+
+    @classmethod
+    def from_cache(cls, cache, key):
+        cached = cache.load(key)
+        if cached is None:
+            raise KeyError(f"Sheet {key} is not in the local cache")
+        return cls.from_rows(cached.header, cached.rows)
+
+    @classmethod
+    def from_rows(cls, header, rows, pending_ops=()):
+        """ A new TermBase loaded with rows; takes seconds for large sheets, so the app builds it on a worker. """
+        termbase = cls()
+        termbase.set_sheet_data(header, rows, pending_ops)
+        return termbase
+
+    @property
+    def loaded(self):
+        return self.store is not None
+
+    def __len__(self):
+        return 0 if self.store is None else len(self.store)
+
+    def iter_rows(self):
+        """ Yield the header, then every row as sheet text, e.g. for an export. """
+        yield list(self.store.header)
+        yield from self.store.iter_rows()
+
+    @timed('termbase.set_sheet_data')
+    def set_sheet_data(self, header, rows, pending_ops=()):
+        # Row IDs stay fixed for local changes while sheet rows may move
+        self.store = TermStore(header, rows)
+        self.generation = next(GENERATIONS)
+        self.edits = 0
+        self.header = list(header)
+        self.column_numbers = {}
+        for number, name in enumerate(self.header, 1):
+            self.column_numbers.setdefault(name, number)
+        self.sheet_rows = dict(zip(self.store.indexes(), range(2, len(self.store) + 2)))
+        self.row_ids = {row: row_id for row_id, row in self.sheet_rows.items()}
+        self.user_column = next((name for name in USER_COLUMNS if name in self.column_numbers), USER_COLUMNS[0])
+
+        self.build_term_index()
+        self.apply_pending_writes(pending_ops)
+
+    def apply_pending_writes(self, ops):
+        # Writes still in the journal are not on the sheet yet, so lay them over the loaded data
+        self.pending_adds = {}
+        added = {}
+        for op in ops:
+            if op['op'] == 'add':
+                added[op['seq']] = self.append_row(self.parse_cells(op['values']))
+                self.pending_adds[added[op['seq']]] = op['seq']
+                continue
+            index = added.get(op['add_id']) if 'add_id' in op else self.row_ids.get(op['row'])
+            if index is not None and index in self.store:
+                self.apply_row_update(index, self.parse_cells(op['cells']))
+
+    @timed('termbase.merge_rows')
+    def merge_rows(self, header, rows, length, pending_ops=()):
+        """ Apply changed sheet rows in place, rows mapping 0-based data positions to values.
+
+        Costs time in proportion to the rows given rather than the size of the sheet. Rows are
+        matched by sheet position, which only holds while no row above them was removed, so
+        this returns False, changing nothing, when the sheet got shorter or the columns differ
+        and a full set_sheet_data is needed. Callers must also reload when rows may have been
+        inserted, as after a checksum pass over the whole sheet.
+        """
+        if not self.loaded or list(header) != self.header or length < max(self.row_ids, default=1) - 1:
+            return False
+        touched = set()
+        for position in sorted(rows):
+            row = position + 2
+            values = self.parse_cells(dict(zip(header, rows[position])))
+            index = self.row_ids.get(row)
+            if index is None:
+                self.set_sheet_row(self.append_row(values), row)
+            else:
+                self.apply_row_update(index, values)
+            touched.add(row)
+
+        # Merged rows came from the sheet, so lay journaled changes to them over again
+        for op in pending_ops:
+            if op['op'] == 'update' and op.get('row') in touched and op['row'] in self.row_ids:
+                self.apply_row_update(self.row_ids[op['row']], self.parse_cells(op['cells']))
+        return True
+
+    @staticmethod
+    def parse_cells(cells):
+        """ Sheet text keyed by header, with 'Reviewed' as the bool the store holds. """
+        cells = dict(cells)
+        if 'Reviewed' in cells:
+            cells['Reviewed'] = str(cells['Reviewed']).strip().lower() == 'true'
+        return cells
+
+    def set_sheet_row(self, index, row):
+        self.sheet_rows[index] = row
+        self.row_ids[row] = index
+
+    def build_term_index(self):
+        self.term_index = {}
+        self.search_engine.clear()
+        self.matcher = None
+        self.text_indexes = {}
+        self.duplicates = None
+        if not self.store:
+            return
+        sources = self.store.column('Source Term')
+        self.search_engine.build(sources)
+        for index, source in zip(self.store.indexes(), sources):
+            self.add_to_term_index(index, source, update_engine=False)
+
+    def add_to_term_index(self, index, source_term, update_engine=True):
+        if update_engine:
+            self.search_engine.add(source_term)
+        key = normalize_term(source_term)
+        if self.matcher is not None and key not in self.term_index:
+            self.matcher.add(source_term)
+        self.term_index.setdefault(key, []).append(index)
+
+    def remove_from_term_index(self, index, source_term):
+        key = normalize_term(source_term)
+        indexes = self.term_index.get(key)
+        if indexes is None or index not in indexes:
+            return
+        indexes.remove(index)
+        self.search_engine.remove(source_term)
+        if not indexes:
+            del self.term_index[key]
+            if self.matcher is not None:
+                self.matcher.remove(source_term)
+
+    def entry(self, index):
+        """ One search result as a plain dict, so callers can hold on to it while rows change. """
+        store = self.store
+        return {
+            'source_term': store.get(index, 'Source Term'),
+            'target_term': store.get(index, 'Target Term'),
+            'notes': store.get(index, 'Notes'),
+            'reviewed': store.reviewed_position is not None and store.get(index, 'Reviewed'),
+            'row': index
+        }
+
+    def find_row(self, source_term, target_term):
+        """ Row ID of the one entry with exactly these source and target terms, or None. """
+        rows = [index for index in self.term_index.get(normalize_term(source_term), ())
+                if self.store.get(index, 'Source Term') == source_term
+                and self.store.get(index, 'Target Term') == target_term]
+        return rows[0] if len(rows) == 1 else None
+
+    def find_equivalent(self, term):
+        return [self.entry(index) for index in self.term_index.get(normalize_term(term), ())]
+
+    def text_index(self, column):
+        """ Word index over column, built on first use and kept in step with the rows from then on. """
+        index = self.text_indexes.get(column)
+        if index is None:
+            rows = self.store.indexes()
+            index = self.text_indexes[column] = TextIndex.build(rows, self.store.column(column, rows))
+        return index
+
+    def text_snapshot(self):
+        """ The texts build_text_indexes needs, copied so the indexes can be built on another thread. """
+        rows = self.store.indexes() if self.loaded else []
+        columns = {column: self.store.column(column, rows) for column in TEXT_COLUMNS
+                   if self.loaded and column in self.store.positions and column not in self.text_indexes}
+        return (self.generation, self.edits), rows, columns
+
+    @staticmethod
+    def build_text_indexes(snapshot):
+        """ Word indexes for a text_snapshot; touches no TermBase, so it can run off the Tk thread. """
+        version, rows, columns = snapshot
+        return version, {column: TextIndex.build(rows, texts) for column, texts in columns.items()}
+
+    def install_text_indexes(self, built):
+        """ Take indexes from build_text_indexes, unless the rows changed while they were built. """
+        version, indexes = built
+        if version != (self.generation, self.edits):
+            return False
+        for column, index in indexes.items():
+            self.text_indexes.setdefault(column, index)
+        return True
+
+    @timed('termbase.search_text')
+    def search_text(self, column, text, limit=MAX_TEXT_RESULTS):
+        """ Entries whose column holds every word of text, best match first. """
+        if column not in TEXT_COLUMNS or not self.loaded or column not in self.store.positions:
+            return []
+        return [self.entry(row) for row, _ in self.text_index(column).search(text, limit)]
+
+    def duplicate_index(self):
+        """ Source terms for duplicate checks, indexed on first use and kept in step with the rows from then on. """
+        if self.duplicates is None:
+            self.duplicates = DuplicateIndex()
+            rows = self.store.indexes()
+            for row, source in zip(rows, self.store.column('Source Term', rows)):
+                self.duplicates.add(row, source)
+        return self.duplicates
+
+    def check_new_term(self, source_term, target_term=''):
+        """ TermCheck of the entries a new source/target pair would repeat or contradict, from local data only. """
+        target_key = duplicate_key(target_term) if target_term else None
+        check = TermCheck([], [], [])
+        if not self.loaded:
+            return check
+        for row in self.duplicate_index().rows(source_term):
+            entry = self.entry(row)
+            if target_key is not None and duplicate_key(entry['target_term']) == target_key:
+                check.duplicates.append(entry)
+            elif entry['reviewed']:
+                check.conflicts.append(entry)
+            else:
+                check.others.append(entry)
+        return check
+
+    @timed('termbase.duplicate_report')
+    def duplicate_report(self):
+        """ DuplicateGroups for the whole sheet, in sheet order.
+
+        Entries with the same source and target term, ignoring case, spacing and punctuation,
+        are one DUPLICATE group; a source term with several targets of which one is reviewed
+        is a CONFLICT group of all its entries. Costs one pass over the index, plus a target
+        key for each entry whose source term is not unique.
+        """
+        groups = []
+        for rows in self.duplicate_index().groups():
+            targets = {}
+            for row in rows:
+                targets.setdefault(duplicate_key(self.store.get(row, 'Target Term')), []).append(row)
+            groups.extend(DuplicateGroup(DUPLICATE, sorted(same)) for same in targets.values() if len(same) > 1)
+            if len(targets) > 1 and self.store.reviewed_position is not None and \
+                    any(self.store.get(row, 'Reviewed') for row in rows):
+                groups.append(DuplicateGroup(CONFLICT, sorted(rows)))
+        groups.sort(key=lambda group: group.rows[0])
+        return groups
+
+    def review_queue(self):
+        store = self.store
+        rows = store.indexes(reviewed=False)
+        sources = store.column('Source Term', rows)
+        targets = store.column('Target Term', rows)
+        users = store.column(self.user_column, rows) if self.user_column in store.positions else [''] * len(rows)
+        return ReviewQueue(rows, sources, targets, users, [normalize_term(source) for source in sources],
+                           [normalize_term(user) for user in users])
+
+    def term_matcher(self):
+        """ Matcher over all source terms for document checks, built on first use and kept in step with the index. """
+        if self.matcher is None:
+            self.matcher = TermMatcher(self.search_engine.labels.values())
+        return self.matcher
+
+    def append_row(self, new_data):
+        self.edits += 1
+        index = self.store.append(new_data)
+        self.add_to_term_index(index, self.store.get(index, 'Source Term'))
+        if self.duplicates is not None:
+            self.duplicates.add(index, self.store.get(index, 'Source Term'))
+        for column, text_index in self.text_indexes.items():
+            text_index.add(index, self.store.get(index, column))
+        return index
+
+    def remove_row(self, index):
+        self.edits += 1
+        self.remove_from_term_index(index, self.store.get(index, 'Source Term'))
+        if self.duplicates is not None:
+            self.duplicates.remove(index, self.store.get(index, 'Source Term'))
+        for column, text_index in self.text_indexes.items():
+            text_index.remove(index, self.store.get(index, column))
+        self.store.remove(index)
+        row = self.sheet_rows.pop(index, None)
+        self.row_ids.pop(row, None)
+        self.pending_adds.pop(index, None)
+
+    def apply_row_update(self, index, changes):
+        """ Change cells of one row, keep the indexes in step and return the previous values. """
+        self.edits += 1
+        previous = {column: self.store.get(index, column) for column in changes if column in self.store.positions}
+        source_term = self.store.get(index, 'Source Term')
+        texts = {column: self.store.get(index, column) for column in self.text_indexes}
+        self.store.update(index, changes)
+        if self.store.get(index, 'Source Term') != source_term:
+            self.remove_from_term_index(index, source_term)
+            self.add_to_term_index(index, self.store.get(index, 'Source Term'))
+            if self.duplicates is not None:
+                self.duplicates.remove(index, source_term)
+                self.duplicates.add(index, self.store.get(index, 'Source Term'))
+        for column, text in texts.items():
+            if self.store.get(index, column) != text:
+                self.text_indexes[column].remove(index, text)
+                self.text_indexes[column].add(index, self.store.get(index, column))
+        return previous
@@ -0,0 +1,120 @@
+import pytest
+
+from fake_worksheet import FakeWorksheet
+from sheet_cache import SheetCache, fetch_revision
+from write_journal import WriteJournal
+
+HEADER = ['Source Term', 'Target Term', 'Notes', 'Reviewed']
+
+
+def make_rows(count):
+    return [[f'term {number}', f'target {number}', '', 'FALSE'] for number in range(count)]
+
+
+@pytest.fixture
+def cache():
+    cache = SheetCache(':memory:')
+    yield cache
+    cache.close()
+
+
+def test_sync_stores_the_sheet_and_skips_an_unchanged_one(cache):
+    worksheet = FakeWorksheet(HEADER, make_rows(30))
+    result = cache.sync('sheet', worksheet)
+    assert result.changed == list(range(30))
+    assert cache.load('sheet').rows == make_rows(30)
+
+    worksheet.calls.clear()
+    result = cache.sync('sheet', worksheet)
+    assert result.changed == []
+    assert worksheet.calls['get'] == 0
+
+
+def test_sync_reports_only_changed_rows(cache):
+    worksheet = FakeWorksheet(HEADER, make_rows(30))
+    cache.sync('sheet', worksheet)
+    worksheet.update_cell(11, 2, 'changed')
+    result = cache.sync('sheet', worksheet)
+    assert result.changed == [9]
+    assert result.rows[9][1] == 'changed'
+
+
+def test_poll_without_changes_reads_nothing(cache):
+    worksheet = FakeWorksheet(HEADER, make_rows(30))
+    cache.sync('sheet', worksheet)
+    worksheet.calls.clear()
+    assert cache.poll('sheet', worksheet) is None
+    assert worksheet.calls['get'] == worksheet.calls['batch_get'] == 0
+
+
+def test_poll_finds_an_appended_row_in_the_tail(cache):
+    worksheet = FakeWorksheet(HEADER, make_rows(30))
+    cache.sync('sheet', worksheet)
+    worksheet.append_row(['new', 'neu', '', False])
+    delta = cache.poll('sheet', worksheet)
+    assert not delta.full
+    assert delta.rows == {30: ['new', 'neu', '', 'FALSE']}
+    assert delta.length == 31
+    assert cache.load('sheet').rows[30] == ['new', 'neu', '', 'FALSE']
+
+
+def test_poll_falls_back_to_a_full_pass_for_a_change_above_the_tail(cache):
+    worksheet = FakeWorksheet(HEADER, make_rows(100))
+    cache.sync('sheet', worksheet)
+    worksheet.update_cell(5, 1, 'edited')
+    delta = cache.poll('sheet', worksheet)
+    assert delta.full
+    assert delta.rows == {3: ['edited', 'target 3', '', 'FALSE']}
+
+
+def test_poll_reports_deleted_rows_with_a_full_pass(cache):
+    worksheet = FakeWorksheet(HEADER, make_rows(30))
+    cache.sync('sheet', worksheet)
+    worksheet.delete_rows(2)
+    delta = cache.poll('sheet', worksheet)
+    assert delta.full
+    assert delta.length == 29
+    assert cache.load('sheet').rows == make_rows(30)[1:]
+
+
+def test_one_append_costs_a_single_tail_read(cache):
+    worksheet = FakeWorksheet(HEADER, make_rows(30000))
+    cache.sync('sheet', worksheet)
+    worksheet.append_row(['new', 'neu', '', 'FALSE'])
+    worksheet.calls.clear()
+    assert cache.poll('sheet', worksheet).rows == {30000: ['new', 'neu', '', 'FALSE']}
+    assert worksheet.calls['batch_get'] == 1 and worksheet.calls['get'] == 0
+
+    # The probed revision is recorded, so the next poll reads nothing
+    worksheet.calls.clear()
+    assert cache.poll('sheet', worksheet) is None
+    assert worksheet.calls['batch_get'] == worksheet.calls['get'] == 0
+
+
+def test_the_periodic_full_check_still_covers_a_probed_revision(cache):
+    worksheet = FakeWorksheet(HEADER, make_rows(100))
+    cache.sync('sheet', worksheet)
+    worksheet.update_cell(5, 1, 'edited')
+    worksheet.append_row(['new', 'neu', '', 'FALSE'])
+    assert cache.poll('sheet', worksheet).rows == {100: ['new', 'neu', '', 'FALSE']}
+    delta = cache.poll('sheet', worksheet, verify=True)
+    assert delta.full and delta.rows == {3: ['edited', 'target 3', '', 'FALSE']}
+
+
+def test_recorded_own_writes_are_not_read_back(cache, tmp_path):
+    worksheet = FakeWorksheet(HEADER, make_rows(100))
+    cache.sync('sheet', worksheet)
+    journal = WriteJournal(str(tmp_path / 'pending_writes.jsonl'))
+    journal.append({'op': 'update', 'row': 5, 'cells': {'Reviewed': 'TRUE'},
+                    'expected': {'Source Term': 'term 3', 'Target Term': 'target 3'}})
+    journal.append({'op': 'add', 'values': {'Source Term': 'new', 'Target Term': 'neu', 'Reviewed': False}})
+    report = journal.replay(worksheet)
+    assert cache.record_writes('sheet', report.saved, fetch_revision(worksheet))
+
+    worksheet.calls.clear()
+    assert cache.poll('sheet', worksheet) is None
+    assert worksheet.calls['batch_get'] == worksheet.calls['get'] == 0
+    rows = cache.load('sheet').rows
+    assert rows[3] == ['term 3', 'target 3', '', 'TRUE']
+    assert rows[100] == ['new', 'neu', '', 'FALSE']
+    assert cache.sync('sheet', worksheet).changed == []
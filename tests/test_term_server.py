@@ -0,0 +1,90 @@
+import asyncio
+import threading
+
+import pytest
+
+from fake_worksheet import FakeWorksheet
+from sheet_cache import SheetCache
+from sheet_client import RemoteError, RemoteWorksheet
+from term_server import TermServer
+from write_journal import WriteJournal
+
+HEADER = ['Source Term', 'Target Term', 'Notes', 'Reviewed']
+TOKEN = 'secret'
+
+
+@pytest.fixture
+def worksheet():
+    return FakeWorksheet(HEADER, [['cat', 'Katze', '', 'FALSE'], ['dog', 'Hund', '', 'FALSE']])
+
+
+@pytest.fixture
+def server_url(worksheet):
+    """ A term server for worksheet on a free localhost port, run on its own thread. """
+    server = TermServer(worksheet, 'fake', SheetCache(':memory:'), token=TOKEN)
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    addresses = []
+
+    def on_ready(address):
+        addresses.append(address)
+        ready.set()
+
+    task = loop.create_task(server.serve('127.0.0.1', 0, on_ready))
+
+    def run():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert ready.wait(10)
+    yield f"http://127.0.0.1:{addresses[0][1]}"
+    loop.call_soon_threadsafe(server.sync_task.cancel)
+    loop.call_soon_threadsafe(task.cancel)
+    thread.join(10)
+    server.executor.shutdown()
+    loop.close()
+
+
+def test_reads_come_from_the_server_copy(server_url, worksheet):
+    remote = RemoteWorksheet(server_url)
+    assert remote.row_values(1) == HEADER
+    assert remote.batch_get(['A2:B3']) == [[['cat', 'Katze'], ['dog', 'Hund']]]
+    assert worksheet.calls['batch_get'] == 0
+
+
+def test_append_reaches_the_sheet_and_the_copy(server_url, worksheet):
+    remote = RemoteWorksheet(server_url, token=TOKEN)
+    response = remote.append_row(['mouse', 'Maus', '', False])
+    assert response['updates']['updatedRange'].endswith('A4:4')
+    assert worksheet.get('A4:D4') == [['mouse', 'Maus', '', 'FALSE']]
+    assert remote.get('A4:D4') == [['mouse', 'Maus', '', 'FALSE']]
+    assert remote.request('GET', '/lookup', term='mouse')['matches']
+
+
+def test_edit_of_a_changed_row_is_a_conflict(server_url, worksheet):
+    remote = RemoteWorksheet(server_url, token=TOKEN)
+    with pytest.raises(RemoteError) as error:
+        remote.request('POST', '/edit', {'row': 3, 'cells': {'Notes': 'pet'}, 'expected': {'Source Term': 'cow'}})
+    assert error.value.code == 409
+    remote.request('POST', '/edit', {'row': 3, 'cells': {'Notes': 'pet'}, 'expected': {'Reviewed': False}})
+    assert worksheet.get('C3') == [['pet']]
+
+
+def test_writes_without_the_token_are_refused(server_url, worksheet):
+    with pytest.raises(RemoteError) as error:
+        RemoteWorksheet(server_url).append_row(['mouse', 'Maus'])
+    assert error.value.code == 401
+    assert len(worksheet.values) == 3
+
+
+def test_journal_replays_through_the_server(server_url, worksheet, tmp_path):
+    journal = WriteJournal(str(tmp_path / 'pending_writes.jsonl'))
+    journal.append({'op': 'add', 'values': {'Source Term': 'mouse', 'Target Term': 'Maus'}})
+    journal.append({'op': 'update', 'row': 3, 'cells': {'Notes': 'pet'}, 'expected': {'Source Term': 'dog'}})
+    report = journal.replay(RemoteWorksheet(server_url, token=TOKEN))
+    assert report.error is None and not report.rejected
+    assert worksheet.get('A3:C4') == [['dog', 'Hund', 'pet'], ['mouse', 'Maus']]
@@ -0,0 +1,124 @@
+import pytest
+
+from fake_worksheet import FakeWorksheet
+from write_journal import WriteJournal
+
+HEADER = ['Source Term', 'Target Term', 'Notes', 'Reviewed']
+
+
+@pytest.fixture
+def worksheet():
+    return FakeWorksheet(HEADER, [['cat', 'Katze', '', 'FALSE'], ['dog', 'Hund', '', 'FALSE']])
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return WriteJournal(str(tmp_path / 'pending_writes.jsonl'))
+
+
+def update(row, cells, source, target):
+    return {'op': 'update', 'row': row, 'cells': cells, 'expected': {'Source Term': source, 'Target Term': target}}
+
+
+def test_replay_appends_adds_by_header_name(worksheet, journal):
+    journal.append({'op': 'add', 'values': {'Target Term': 'Maus', 'Source Term': 'mouse', 'Reviewed': False}})
+    report = journal.replay(worksheet)
+    assert report.error is None and not report.rejected
+    assert report.saved[0]['row'] == 4
+    assert worksheet.get('A4:D4') == [['mouse', 'Maus', '', 'FALSE']]
+    assert len(journal) == 0
+
+
+def test_replay_writes_an_update_whose_row_is_unchanged(worksheet, journal):
+    journal.append(update(3, {'Notes': 'pet'}, 'dog', 'Hund'))
+    report = journal.replay(worksheet)
+    assert [op['row'] for op in report.saved] == [3]
+    assert worksheet.get('C3') == [['pet']]
+
+
+def test_replay_follows_a_row_that_moved(worksheet, journal):
+    journal.append(update(3, {'Notes': 'pet'}, 'dog', 'Hund'))
+    worksheet.insert_row(['bird', 'Vogel', '', 'FALSE'], 2)
+    report = journal.replay(worksheet)
+    assert report.saved[0]['row'] == 4
+    assert report.saved[0]['relocated_from'] == 3
+    assert worksheet.get('C4') == [['pet']]
+
+
+def test_replay_rejects_an_update_of_a_row_changed_by_someone_else(worksheet, journal):
+    journal.append(update(3, {'Notes': 'pet'}, 'dog', 'Hund'))
+    worksheet.update_cell(3, 2, 'Köter')
+    report = journal.replay(worksheet)
+    assert not report.saved
+    assert len(report.rejected) == 1
+    assert worksheet.get('C3') == []
+    assert len(journal) == 0
+
+
+def test_replay_keeps_writes_after_a_connection_problem(worksheet, journal, tmp_path):
+    def offline(*args, **kwargs):
+        raise ConnectionError("offline")
+
+    worksheet.batch_update = offline
+    journal.append(update(3, {'Notes': 'pet'}, 'dog', 'Hund'))
+    report = journal.replay(worksheet)
+    assert report.error is not None
+    assert len(WriteJournal(journal.path)) == 1
+
+
+def test_replay_leaves_other_sheets_waiting(worksheet, journal):
+    journal.append(dict(update(3, {'Notes': 'pet'}, 'dog', 'Hund'), sheet='other'))
+    journal.append(dict(update(2, {'Notes': 'animal'}, 'cat', 'Katze'), sheet='main'))
+    report = journal.replay(worksheet, 'main')
+    assert [op['sheet'] for op in report.saved] == ['main']
+    assert [op['sheet'] for op in journal.pending()] == ['other']
+
+
+def lose_append_responses(worksheet):
+    append_row = worksheet.append_row
+
+    def append_then_fail(*args, **kwargs):
+        append_row(*args, **kwargs)
+        raise ConnectionError("response lost")
+
+    worksheet.append_row = append_then_fail
+
+
+def test_replay_does_not_repeat_an_add_that_landed_before_a_failure(worksheet, journal):
+    journal.append({'op': 'add', 'values': {'Source Term': 'mouse', 'Target Term': 'Maus', 'Reviewed': False}})
+    lose_append_responses(worksheet)
+    assert journal.replay(worksheet).error is not None
+    del worksheet.append_row
+    report = WriteJournal(journal.path).replay(worksheet)
+    assert report.saved[0]['row'] == 4
+    assert worksheet.get('A4:D5') == [['mouse', 'Maus', '', 'FALSE']]
+
+
+def test_replay_does_not_take_an_older_identical_row_for_a_sent_add(worksheet, journal):
+    journal.append({'op': 'add', 'values': {'Source Term': 'cat', 'Target Term': 'Katze', 'Reviewed': False}})
+
+    def offline(*args, **kwargs):
+        raise ConnectionError("offline")
+
+    worksheet.append_row = offline
+    assert journal.replay(worksheet).error is not None
+    del worksheet.append_row
+    report = WriteJournal(journal.path).replay(worksheet)
+    assert report.saved[0]['row'] == 4
+    assert worksheet.get('A4:B4') == [['cat', 'Katze']]
+
+
+def test_an_update_queued_while_its_add_is_in_flight_goes_to_the_added_row(worksheet, journal):
+    add_id = journal.append({'op': 'add', 'values': {'Source Term': 'mouse', 'Target Term': 'Maus'}})
+    append_row = worksheet.append_row
+
+    def append_while_editing(*args, **kwargs):
+        journal.append({'op': 'update', 'add_id': add_id, 'cells': {'Notes': 'small'}})
+        return append_row(*args, **kwargs)
+
+    worksheet.append_row = append_while_editing
+    journal.replay(worksheet)
+    assert [op.get('row') for op in journal.pending()] == [4]
+    report = WriteJournal(journal.path).replay(worksheet)
+    assert not report.rejected
+    assert worksheet.get('A4:C4') == [['mouse', 'Maus', 'small']]
@@ -0,0 +1,117 @@
+import heapq
+from array import array
+import math
+import re
+from collections import Counter
+
+from search_engine import normalize_term
+from term_qa import UNSPACED_CHARS
+
+MAX_TEXT_RESULTS = 50
+BM25_K1 = 1.2
+BM25_B = 0.75
+# The words of term_qa's tokens, without the punctuation
+WORD_PATTERN = re.compile(rf'[{UNSPACED_CHARS}]|(?:(?![{UNSPACED_CHARS}])\w)+')
+
+
+def text_tokens(text):
+    """ Folded words of text; scripts written without spaces give one word per character. """
+    return WORD_PATTERN.findall(normalize_term(text))
+
+
+class TextIndex:
+    """ Inverted index over the words of one text column, for reverse and full-text lookups.
+
+    postings maps each folded word to the row IDs containing it, and repeats holds the count
+    for the few (word, row ID) pairs where the word occurs more than once, which keeps the
+    index to a list entry per word of a row. Row IDs are the store's, which are dense, so
+    the word count of each row is kept in an array indexed by row ID, 0 for rows not indexed.
+    A query matches the rows holding all its words and ranks them with BM25, which puts a row
+    whose text is just the query words first and favors rarer words and shorter texts. Rows
+    are removed with the text they were indexed with, so edits cost time in proportion to the
+    words of that one row.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.repeats = {}
+        self.lengths = array('I')
+        self.count = 0
+        self.total_length = 0
+
+    def __len__(self):
+        return self.count
+
+    @classmethod
+    def build(cls, rows, texts):
+        index = cls()
+        for row, text in zip(rows, texts):
+            index.add(row, text)
+        return index
+
+    def add(self, row, text):
+        words = text_tokens(text)
+        if row >= len(self.lengths):
+            self.lengths.extend(bytes(max(row + 1 - len(self.lengths), len(self.lengths) // 2)))
+        if not words or self.lengths[row]:
+            return
+        self.lengths[row] = len(words)
+        self.count += 1
+        self.total_length += len(words)
+        for word, frequency in Counter(words).items():
+            self.postings.setdefault(word, []).append(row)
+            if frequency > 1:
+                self.repeats[word, row] = frequency
+
+    def remove(self, row, text):
+        if row >= len(self.lengths) or not self.lengths[row]:
+            return
+        self.count -= 1
+        self.total_length -= self.lengths[row]
+        self.lengths[row] = 0
+        for word in set(text_tokens(text)):
+            posting = self.postings.get(word)
+            if posting is None or row not in posting:
+                continue
+            posting.remove(row)
+            self.repeats.pop((word, row), None)
+            if not posting:
+                del self.postings[word]
+
+    def search(self, text, limit=MAX_TEXT_RESULTS):
+        """ (row, score) pairs of the best rows containing every word of text, best first. """
+        words = Counter(text_tokens(text))
+        postings = [(word, self.postings.get(word)) for word in words]
+        if not postings or not all(posting for _, posting in postings):
+            return []
+        postings.sort(key=lambda item: len(item[1]))
+        candidates = set(postings[0][1])
+        for _, posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return []
+
+        count = self.count
+        average_length = self.total_length / count
+        lengths = self.lengths
+        repeats = self.repeats
+        # Texts are a few words long, so the length part of the score is worked out once per length
+        norms = {length: BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                 for length in {lengths[row] for row in candidates}}
+        scores = dict.fromkeys(candidates, 0.0)
+        for word, posting in postings:
+            weight = words[word] * (BM25_K1 + 1) * math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+            for row in candidates:
+                frequency = repeats.get((word, row), 1) if repeats else 1
+                scores[row] += weight * frequency / (frequency + norms[lengths[row]])
+
+        # Scores repeat a lot, so only the rows above the lowest score that makes the cut are sorted;
+        # rows with that score are taken in sheet order until the limit is reached
+        above = 0
+        for cutoff, rows in sorted(Counter(scores.values()).items(), reverse=True):
+            if above + rows >= limit:
+                break
+            above += rows
+        best = sorted((-score, row) for row, score in scores.items() if score > cutoff)
+        tied = heapq.nsmallest(limit - len(best), (row for row, score in scores.items() if score == cutoff))
+        return [(row, -score) for score, row in best] + [(row, cutoff) for row in tied]
@@ -0,0 +1,80 @@
+import random
+import time
+
+from sheet_cache import column_letter
+
+RETRY_STATUS_CODES = (429, 500, 503)
+# A rate-limited request was turned away before it ran, so even an append can be sent again
+RATE_LIMIT_STATUS_CODES = (429,)
+MAX_RETRIES = 6
+BASE_DELAY = 1.0
+MAX_DELAY = 32.0
+
+
+def error_status(error):
+    """ HTTP status of a gspread APIError, or None for anything else. """
+    code = getattr(error, 'code', None)
+    if isinstance(code, int) and code > 0:
+        return code
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', None)
+
+
+def call_with_backoff(func, *args, max_retries=MAX_RETRIES, base_delay=BASE_DELAY, sleep=time.sleep,
+                      retry_on=RETRY_STATUS_CODES, **kwargs):
+    """ Call func, retrying rate-limit and transient server errors with jittered exponential backoff.
+
+    A 500 or 503 may come after the request took effect, so calls that must not run twice,
+    like append_row, pass retry_on=RATE_LIMIT_STATUS_CODES.
+    """
+    attempt = 0
+    while True:
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            if error_status(e) not in retry_on or attempt >= max_retries:
+                raise
+            delay = min(base_delay * 2 ** attempt, MAX_DELAY)
+            sleep(delay + random.uniform(0, delay / 2))
+            attempt += 1
+
+
+class WriteBatch:
+    """ Pending cell changes sent to the sheet with a single batch_update.
+
+    Later writes to the same cell replace earlier ones, and adjacent cells of a row are
+    merged into one range, so an edit or a whole reviewer session is one API request.
+    """
+
+    def __init__(self):
+        self.cells = {}
+
+    def __len__(self):
+        return len(self.cells)
+
+    def set_cell(self, row, col, value):
+        self.cells[(row, col)] = value
+
+    def set_row(self, row, values, first_col=1):
+        for offset, value in enumerate(values):
+            self.set_cell(row, first_col + offset, value)
+
+    def ranges(self):
+        data = []
+        for (row, col) in sorted(self.cells):
+            value = self.cells[(row, col)]
+            if data and data[-1]['row'] == row and data[-1]['end'] == col - 1:
+                data[-1]['values'][0].append(value)
+                data[-1]['end'] = col
+            else:
+                data.append({'row': row, 'start': col, 'end': col, 'values': [[value]]})
+        return [{'range': f"{column_letter(item['start'])}{item['row']}:{column_letter(item['end'])}{item['row']}",
+                 'values': item['values']} for item in data]
+
+    def commit(self, worksheet):
+        if not self.cells:
+            return 0
+        call_with_backoff(worksheet.batch_update, self.ranges(), value_input_option='USER_ENTERED')
+        count = len(self.cells)
+        self.cells = {}
+        return count
@@ -0,0 +1,315 @@
+import json
+import os
+import re
+import threading
+from collections import namedtuple
+
+from sheet_cache import column_letter, sheet_text
+from write_batch import WriteBatch, call_with_backoff, error_status, RATE_LIMIT_STATUS_CODES, RETRY_STATUS_CODES
+
+JOURNAL_FILE = 'pending_writes.jsonl'
+
+ReplayReport = namedtuple('ReplayReport', ['saved', 'rejected', 'error'])
+
+
+def parse_updated_row(response):
+    """ Sheet row written by append_row, from the 'updatedRange' of the API response. """
+    try:
+        updated_range = response['updates']['updatedRange']
+    except (KeyError, TypeError):
+        return None
+    match = re.search(r'![A-Z]+(\d+)', updated_range)
+    return int(match.group(1)) if match else None
+
+
+def is_transient(error):
+    """ Errors worth retrying later: no HTTP status at all (connection problems) or rate limits. """
+    status = error_status(error)
+    return status is None or status in RETRY_STATUS_CODES
+
+
+class WriteJournal:
+    """ Append-only, fsynced log of sheet writes that have not reached Google Sheets yet.
+
+    Operations are dicts with a 'seq' number and an 'op' of either:
+      'add'    - {'values': {header: value}} appended as a new row
+      'update' - {'row': sheet_row, 'cells': {header: value}, 'expected': {header: value}}
+                 or {'add_id': seq, 'cells': {...}} for a row whose add is still pending
+    Operations may carry the cache key of their sheet under 'sheet'. pending(), count() and
+    replay() given a key only see that sheet's operations and those written without a key,
+    so writes made before switching sheets wait for their own sheet instead of landing on
+    the new one. Columns are named by header and resolved against the sheet's header row at
+    replay time, so reordered columns do not send values to the wrong place. An update whose
+    row no longer holds the expected values is moved to the one row that does, if there is
+    exactly one; otherwise it is rejected as a conflict.
+
+    Finished operations are recorded with a {'done': [seq, ...]} line, which for an add also
+    holds the row it ended up in as {'rows': {seq: row}}. Just before its
+    append_row an add is recorded with a {'sent': [seq], 'after': row} line, row being the last
+    row of the sheet then. A sent add that did not finish may be on the sheet already, since an
+    append that failed with a server error can still have gone through, so replay() looks for
+    a row below that one holding its values, as Sheets renders them, before appending it again;
+    an identical entry added earlier on purpose is above it and does not count. compact()
+    folds updates into pending adds that were never sent, merges updates of the same row and
+    rewrites the file without finished entries. Updates of a sent add, including ones queued
+    while it was in flight, are turned into updates of its row once the add is done.
+    replay() sends operations in order and stops at the first connection problem, leaving
+    the rest for the next attempt.
+    """
+
+    def __init__(self, path=JOURNAL_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.ops = []
+        self.resolved = {}
+        self.next_seq = 1
+        self._load()
+        self.compact()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        done = set()
+        sent = {}
+        with open(self.path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # A torn last line from a crash mid-write
+                if 'done' in record:
+                    done.update(record['done'])
+                    self.resolved.update((int(seq), row) for seq, row in record.get('rows', {}).items())
+                elif 'op' not in record:
+                    sent.update(dict.fromkeys(record['sent'], record.get('after', 1)))
+                else:
+                    self.ops.append(record)
+                    self.next_seq = max(self.next_seq, record['seq'] + 1)
+        self.ops = [op for op in self.ops if op['seq'] not in done]
+        for op in self.ops:
+            if op['seq'] in sent:
+                op['sent'] = sent[op['seq']]
+
+    def _write_line(self, record):
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+
+    def __len__(self):
+        with self.lock:
+            return len(self.ops)
+
+    def append(self, op):
+        with self.lock:
+            # Round-trip through JSON so in-memory ops look exactly like replayed ones
+            op = json.loads(json.dumps(dict(op, seq=self.next_seq), ensure_ascii=False))
+            self._resolve(op)
+            self.next_seq += 1
+            self._write_line(op)
+            self.ops.append(op)
+            return op['seq']
+
+    @staticmethod
+    def belongs_to(op, sheet):
+        return sheet is None or op.get('sheet', sheet) == sheet
+
+    def pending(self, sheet=None):
+        with self.lock:
+            return [dict(op) for op in self.ops if self.belongs_to(op, sheet)]
+
+    def count(self, sheet=None):
+        with self.lock:
+            return sum(1 for op in self.ops if self.belongs_to(op, sheet))
+
+    def is_pending(self, seq):
+        with self.lock:
+            return any(op['seq'] == seq for op in self.ops)
+
+    def mark_done(self, seqs, rows=None):
+        """ Drop finished operations; rows maps the seq of a finished add to the sheet row it landed in. """
+        seqs = set(seqs)
+        if not seqs:
+            return
+        with self.lock:
+            self._write_line({'done': sorted(seqs), 'rows': rows} if rows else {'done': sorted(seqs)})
+            self.resolved.update(rows or {})
+            self.ops = [op for op in self.ops if op['seq'] not in seqs]
+            for op in self.ops:
+                self._resolve(op)
+
+    def _resolve(self, op):
+        """ Turn an update of a finished add into an update of the row the add ended up in. """
+        if op.get('add_id') in self.resolved:
+            op['row'] = self.resolved[op.pop('add_id')]
+            op['expected'] = {}
+
+    def mark_sent(self, seq, after):
+        with self.lock:
+            self._write_line({'sent': [seq], 'after': after})
+            for op in self.ops:
+                if op['seq'] == seq:
+                    op['sent'] = after
+
+    def compact(self):
+        with self.lock:
+            ops = []
+            adds = {}
+            updates = {}
+            for op in self.ops:
+                self._resolve(op)
+                if op['op'] == 'add':
+                    adds[op['seq']] = op
+                    ops.append(op)
+                elif op.get('add_id') in adds and 'sent' not in adds[op['add_id']]:
+                    adds[op['add_id']]['values'].update(op['cells'])
+                elif (op.get('sheet'), op.get('row')) in updates:
+                    # The earliest op keeps its expected values, which describe the row as it is on the sheet
+                    updates[op.get('sheet'), op['row']]['cells'].update(op['cells'])
+                else:
+                    if 'row' in op:
+                        updates[op.get('sheet'), op['row']] = op
+                    ops.append(op)
+            self.ops = ops
+
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                for op in self.ops:
+                    file.write(json.dumps(op, ensure_ascii=False) + '\n')
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self.path)
+
+    def replay(self, worksheet, sheet=None):
+        """ Send the pending operations of sheet, or all of them when no key is given, in order. """
+        self.compact()
+        ops = self.pending(sheet)
+        saved = []
+        rejected = []
+        if not ops:
+            return ReplayReport(saved, rejected, None)
+        try:
+            header = call_with_backoff(worksheet.row_values, 1)
+        except Exception as e:
+            return ReplayReport(saved, rejected, e)
+        columns = {name: number for number, name in reversed(list(enumerate(header, 1)))}
+        located = {}
+        last_row = None
+        position = 0
+        while position < len(ops):
+            if ops[position]['op'] == 'add':
+                step = [ops[position]]
+            else:
+                end = position
+                while end < len(ops) and ops[end]['op'] == 'update':
+                    end += 1
+                step = ops[position:end]
+            position += len(step)
+
+            rows = None
+            try:
+                if step[0]['op'] == 'add':
+                    values = step[0]['values']
+                    row = None
+                    if 'sent' in step[0]:
+                        row = self._find_added(worksheet, values, columns, step[0]['sent'])
+                    if row is None:
+                        if last_row is None:
+                            last_row = self._last_row(worksheet, columns)
+                        self.mark_sent(step[0]['seq'], last_row)
+                        response = call_with_backoff(worksheet.append_row, [values.get(name, '') for name in header],
+                                                     retry_on=RATE_LIMIT_STATUS_CODES)
+                        row = parse_updated_row(response)
+                        last_row = max(last_row + 1, row or 0)
+                    step[0]['row'] = row
+                    if row is not None:
+                        rows = {step[0]['seq']: row}
+                    saved.extend(step)
+                else:
+                    for op in step:
+                        self._resolve(op)
+                    accepted, conflicts = self._write_updates(worksheet, step, columns, located)
+                    saved.extend(accepted)
+                    rejected.extend(conflicts)
+            except Exception as e:
+                if is_transient(e):
+                    self.compact()
+                    return ReplayReport(saved, rejected, e)
+                rejected.extend((op, str(e)) for op in step)
+            self.mark_done((op['seq'] for op in step), rows)
+
+        self.compact()
+        return ReplayReport(saved, rejected, None)
+
+    def _write_updates(self, worksheet, ops, columns, located):
+        accepted = []
+        conflicts = []
+        rows = {}
+        targets = [op for op in ops if 'row' in op]
+        missing = {name for op in targets for name in list(op['cells']) + list(op['expected']) if name not in columns}
+        if targets and not missing:
+            width = max(columns[name] for op in targets for name in list(op['cells']) + list(op['expected']))
+            row_numbers = sorted({op['row'] for op in targets})
+            values = call_with_backoff(worksheet.batch_get,
+                                       [f"A{row}:{column_letter(width)}{row}" for row in row_numbers])
+            rows = {row: (value[0] if value else []) for row, value in zip(row_numbers, values)}
+
+        batch = WriteBatch()
+        for op in ops:
+            if 'row' not in op:
+                conflicts.append((op, "the new term was saved before this change could be merged into it"))
+                continue
+            if missing:
+                conflicts.append((op, f"column(s) {', '.join(sorted(missing))} not found in the sheet"))
+                continue
+            if not self._row_matches(rows[op['row']], op['expected'], columns):
+                row = self._locate(worksheet, op['expected'], columns, located)
+                if row is None:
+                    conflicts.append((op, f"row {op['row']} was changed by someone else"))
+                    continue
+                op['relocated_from'] = op['row']
+                op['row'] = row
+            for name, value in op['cells'].items():
+                batch.set_cell(op['row'], columns[name], value)
+            accepted.append(op)
+        batch.commit(worksheet)
+        return accepted, conflicts
+
+    def _row_matches(self, row, expected, columns):
+        for name, value in expected.items():
+            number = columns[name]
+            if (row[number - 1] if number <= len(row) else '') != sheet_text(value):
+                return False
+        return True
+
+    def _locate(self, worksheet, expected, columns, located):
+        """ The only sheet row holding the expected values, or None; columns are read once per replay. """
+        matches = self._rows_holding(worksheet, expected, columns, located)
+        return matches[0] if len(matches) == 1 else None
+
+    def _find_added(self, worksheet, values, columns, after):
+        """ First row below after holding every value of an add, or None; read fresh, as rows were appended since. """
+        expected = {name: value for name, value in values.items() if name in columns}
+        matches = [row for row in self._rows_holding(worksheet, expected, columns, {}) if row > after]
+        return matches[0] if matches and expected else None
+
+    def _last_row(self, worksheet, columns):
+        """ Last sheet row with a source or target term; append_row adds rows below it. """
+        letters = [column_letter(columns[name]) for name in ('Source Term', 'Target Term') if name in columns] or ['A']
+        blocks = call_with_backoff(worksheet.batch_get, [f"{letter}2:{letter}" for letter in letters])
+        return 1 + max((len(block) for block in blocks), default=0)
+
+    def _rows_holding(self, worksheet, expected, columns, located):
+        names = sorted(expected)
+        key = tuple(names)
+        if key not in located:
+            blocks = call_with_backoff(worksheet.batch_get,
+                                       [f"{column_letter(columns[name])}2:{column_letter(columns[name])}" for name in names])
+            values = [[cell[0] if cell else '' for cell in block] for block in blocks]
+            length = max((len(column) for column in values), default=0)
+            index = {}
+            for position in range(length):
+                row_key = tuple(column[position] if position < len(column) else '' for column in values)
+                index.setdefault(row_key, []).append(position + 2)
+            located[key] = index
+        return located[key].get(tuple(sheet_text(expected[name]) for name in names), [])